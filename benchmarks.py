@@ -0,0 +1,470 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import database
+import recipe_store
+import rules
+from fake_spoonacular import SYNTHETIC_INGREDIENTS, FakeSpoonacular, synthetic_recipe
+
+def build_synthetic_database(path, count, seed=42):
+    """Populate a fresh database at path with count synthetic recipes"""
+    rng = random.Random(seed)
+    database.DATABASE_FILE = path
+    database.create_database()
+    records = (database.extract_recipe_data(synthetic_recipe(i, rng)) for i in range(1, count + 1))
+    database.save_recipes_batch(records, batch_size=5000)
+
+def time_call(func, repeat=5):
+    """Best-of-repeat wall time for func in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def read_path_queries():
+    """Representative read queries issued by the app"""
+    return {
+        "get_recipes()": lambda: database.get_recipes(limit=200),
+        "get_recipes(diet, meal)": lambda: database.get_recipes(limit=200, diet_type="vegetarian", meal_type="breakfast"),
+        "get_recipes(uncooked, <=400 kcal)": lambda: database.get_recipes(limit=200, cooking_status="uncooked", max_calories=400),
+        "search_recipes('garlic')": lambda: database.search_recipes("garlic", limit=20),
+        "get_recipe_by_id": lambda: database.get_recipe_by_id(4242)
+    }
+
+def bench_indexes(count):
+    """Compare read query timings without and with the idx_* indexes of the index migrations"""
+    path = os.path.join(tempfile.mkdtemp(), "bench_indexes.db")
+    print(f"Building {count} synthetic recipes in {path}")
+    build_synthetic_database(path, count)
+
+    # Drop only the idx_* indexes. recipe_summary, recipes_fts and the ingredient id tables from later
+    # migrations stay, since today's read paths need them, so this isolates the indexes rather than
+    # reproducing the pre-migration schema and queries
+    conn = sqlite3.connect(path)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall():
+        conn.execute(f"DROP INDEX {name}")
+    conn.execute("DELETE FROM schema_version")
+    conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+    conn.commit()
+    conn.close()
+    if database.PUBLISH_READ_SNAPSHOTS:
+        database.publish_read_snapshot()
+    database.close_connections()
+
+    before = {name: time_call(query) for name, query in read_path_queries().items()}
+    database.close_connections()
+    database.migrate_database()
+    after = {name: time_call(query) for name, query in read_path_queries().items()}
+
+    print(f"{'query':<36}{'no idx ms':>12}{'idx ms':>12}")
+    for name in before:
+        print(f"{name:<36}{before[name]:>12.2f}{after[name]:>12.2f}")
+
+def bench_ingest(target_count, modes, latency=0.0, jitter=0.0, error_rate=0.0, quota=None):
+    """Measure end-to-end recipes/sec from a local fake Spoonacular into a fresh database"""
+    workdir = tempfile.mkdtemp()
+    original_url = database.SPOONACULAR_API_URL
+    original_delay = database.API_DELAY
+    if not database.SPOONACULAR_API_KEY:
+        database.set_spoonacular_api_key("fake-key")
+    # The fake server has no per-second limit, so measure raw throughput
+    database.API_DELAY = 0
+
+    results = []
+    try:
+        for mode in modes:
+            database.DATABASE_FILE = os.path.join(workdir, f"ingest_{mode}.db")
+            database.CACHE_DIR = os.path.join(workdir, f"cache_{mode}")
+            with FakeSpoonacular(latency=latency, jitter=jitter, error_rate=error_rate, quota=quota) as fake:
+                database.SPOONACULAR_API_URL = fake.url
+                start = time.perf_counter()
+                database.collect_recipes(
+                    target_count=target_count,
+                    pipelined=mode != "sequential",
+                    streaming=mode == "streaming",
+                    resume=False
+                )
+                elapsed = time.perf_counter() - start
+                stored = database.count_recipes()
+                results.append((mode, stored, elapsed, fake.stats()))
+            database.close_connections()
+    finally:
+        database.SPOONACULAR_API_URL = original_url
+        database.API_DELAY = original_delay
+
+    print(f"{'mode':<12}{'stored':>8}{'seconds':>10}{'recipes/s':>12}{'requests':>10}{'500s':>6}{'402s':>6}")
+    for mode, stored, elapsed, stats in results:
+        print(f"{mode:<12}{stored:>8}{elapsed:>10.2f}{stored / elapsed:>12.1f}"
+              f"{stats['requests']:>10}{stats['errors']:>6}{stats['quota_rejections']:>6}")
+    return results
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def bench_snapshot_reads(count, target_count, latency=0.01):
+    """Read latency while a backfill runs, with reads on the primary versus published snapshots"""
+    original_url = database.SPOONACULAR_API_URL
+    original_delay = database.API_DELAY
+    original_publish = database.PUBLISH_READ_SNAPSHOTS
+    if not database.SPOONACULAR_API_KEY:
+        database.set_spoonacular_api_key("fake-key")
+    database.API_DELAY = 0
+
+    results = []
+    try:
+        for publish in (False, True):
+            database.PUBLISH_READ_SNAPSHOTS = publish
+            workdir = tempfile.mkdtemp()
+            database.CACHE_DIR = os.path.join(workdir, "cache")
+            build_synthetic_database(os.path.join(workdir, "snapshot_reads.db"), count)
+            database.close_connections()
+
+            with FakeSpoonacular(latency=latency) as fake:
+                database.SPOONACULAR_API_URL = fake.url
+                ingest = threading.Thread(
+                    target=database.collect_recipes_pipelined,
+                    kwargs={"target_count": target_count, "resume": False}
+                )
+                ingest.start()
+                timings = []
+                while ingest.is_alive():
+                    start = time.perf_counter()
+                    database.get_recipes(limit=200, diet_type="vegetarian", max_calories=600)
+                    timings.append((time.perf_counter() - start) * 1000)
+                ingest.join()
+            database.close_connections()
+            results.append(("snapshot" if publish else "primary", timings))
+    finally:
+        database.SPOONACULAR_API_URL = original_url
+        database.API_DELAY = original_delay
+        database.PUBLISH_READ_SNAPSHOTS = original_publish
+
+    print(f"{'reads from':<12}{'reads':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, timings in results:
+        print(f"{name:<12}{len(timings):>8}{percentile(timings, 0.5):>10.2f}"
+              f"{percentile(timings, 0.99):>10.2f}{max(timings, default=0):>10.2f}")
+    return results
+
+def synthetic_recipe_frame(count, seed=42, ingredient_lists=1024):
+    """get_recipes-shaped DataFrame of count synthetic recipes, generated column-wise"""
+    rng = np.random.default_rng(seed)
+    protein = rng.uniform(2, 60, count).round(2)
+    carbs = rng.uniform(2, 90, count).round(2)
+    fat = rng.uniform(1, 45, count).round(2)
+
+    # Draw tag and ingredient lists from small pools of pre-joined strings
+    tag_pool = [", ".join(rng.choice(database.DIET_TYPES, size=k, replace=False)) for k in rng.integers(0, 4, 256)]
+    ingredient_pool = [
+        ", ".join(rng.choice(SYNTHETIC_INGREDIENTS, size=k, replace=False)) for k in rng.integers(4, 13, ingredient_lists)
+    ]
+    return pd.DataFrame({
+        "id": np.arange(1, count + 1),
+        "name": [f"Recipe {i}" for i in range(1, count + 1)],
+        "image": None,
+        "calories": (protein * 4 + carbs * 4 + fat * 9).round(),
+        "protein": protein,
+        "carbs": carbs,
+        "fat": fat,
+        "fiber": rng.uniform(0, 15, count).round(2),
+        "cooking_status": rng.choice(["cooked", "uncooked"], count),
+        "category": rng.choice(["lunch", "breakfast", "dinner", "snack"], count),
+        "meal_type": rng.choice(database.MEAL_TYPES, count),
+        "diet_tags": np.array(tag_pool, dtype=object)[rng.integers(0, len(tag_pool), count)],
+        "ingredients": np.array(ingredient_pool, dtype=object)[rng.integers(0, len(ingredient_pool), count)]
+    })
+
+BENCH_PREFERENCES = {
+    "diet_type": "Vegetarian",
+    "allergies": ["peanut", "shrimp"],
+    "cooking_preference": "Cooked meals",
+    "calories": 2000,
+    "goal": "weight loss"
+}
+
+def bench_rules(counts, rowwise_limit=None):
+    """Compare row-wise and vectorized filter_recipes_with_rules"""
+    rule_list = rules.create_rules_from_preferences(BENCH_PREFERENCES)
+    print(f"{'recipes':>10}{'row-wise s':>14}{'vectorized s':>14}{'speedup':>10}{'matched':>10}")
+    for count in counts:
+        recipes = synthetic_recipe_frame(count)
+        start = time.perf_counter()
+        vectorized = rules.filter_recipes_with_rules(recipes, rule_list)
+        vectorized_time = time.perf_counter() - start
+
+        if rowwise_limit is not None and count > rowwise_limit:
+            print(f"{count:>10}{'skipped':>14}{vectorized_time:>14.3f}{'':>10}{len(vectorized):>10}")
+            continue
+        start = time.perf_counter()
+        rowwise = rules.filter_recipes_with_rules_rowwise(recipes, rule_list)
+        rowwise_time = time.perf_counter() - start
+        if rowwise != vectorized:
+            raise AssertionError(f"Vectorized rules disagree with the row-wise reference at {count} recipes")
+        print(f"{count:>10}{rowwise_time:>14.3f}{vectorized_time:>14.3f}"
+              f"{rowwise_time / vectorized_time:>9.1f}x{len(vectorized):>10}")
+
+def bench_allergens(count, allergies):
+    """Allergy exclusion by substring scan versus the allergen inverted index"""
+    recipes = synthetic_recipe_frame(count, ingredient_lists=min(count, 200000))
+    rule_list = [rules.FoodRule("exclude_ingredient", allergy.lower(), priority=10) for allergy in allergies]
+
+    start = time.perf_counter()
+    index = recipe_store.AllergenIndex.build(recipes["id"].to_numpy(), recipes["ingredients"].tolist(), source_version="synthetic")
+    build_time = time.perf_counter() - start
+
+    def passing(allergen_index):
+        columns = rules.RecipeColumns(recipes, allergen_index, catalog_version="synthetic")
+        return rules.RulePlan(rule_list).passing(rule_list, columns)
+
+    scan_time = time_call(lambda: passing(None), repeat=3) / 1000
+    index_time = time_call(lambda: passing(index), repeat=3) / 1000
+    if not np.array_equal(passing(None), passing(index)):
+        raise AssertionError("Allergen index disagrees with the substring scan")
+
+    print(f"{count} recipes, {len(index.term_list)} ingredient terms, allergies: {', '.join(allergies)}")
+    print(f"index build {build_time:.3f} s")
+    print(f"substring scan {scan_time:.3f} s, index {index_time:.3f} s ({scan_time / index_time:.1f}x)")
+
+def bench_macros(count, k, goals):
+    """Top-k closest macro ratios per goal, by a full scan versus the macro grid index"""
+    recipes = synthetic_recipe_frame(count)
+    start = time.perf_counter()
+    index = recipe_store.MacroIndex.build(recipes["protein"], recipes["carbs"], recipes["fat"])
+    build_time = time.perf_counter() - start
+
+    def scan(target):
+        fractions = recipe_store.macro_fractions(recipes["protein"], recipes["carbs"], recipes["fat"]).astype(np.float32)
+        point = np.array([target["protein"], target["carbs"], target["fat"]])
+        distances = np.sqrt(((fractions - point) ** 2).sum(axis=1))
+        distances[np.isnan(distances)] = np.inf
+        return np.lexsort((np.arange(len(distances)), distances))[:k]
+
+    print(f"{count} recipes, k={k}, index build {build_time:.3f} s")
+    print(f"{'goal':<16}{'scan ms':>10}{'index ms':>10}{'speedup':>10}{'best distance':>15}")
+    for goal in goals:
+        target = rules.goal_macro_target(goal)
+        rows, distances = index.nearest(target, k)
+        if not np.array_equal(rows, scan(target)):
+            raise AssertionError(f"Macro index disagrees with the full scan for {goal!r}")
+        scan_time = time_call(lambda: scan(target), repeat=3)
+        index_time = time_call(lambda: index.nearest(target, k), repeat=20)
+        print(f"{goal:<16}{scan_time:>10.2f}{index_time:>10.3f}{scan_time / index_time:>9.0f}x{distances[0]:>15.4f}")
+
+def random_preferences(rng):
+    """A preference profile like the ones the app's form produces"""
+    return {
+        "diet_type": rng.choice(["No restrictions", "Vegetarian", "Vegan", "Gluten Free", "Ketogenic"]),
+        "allergies": rng.sample(["Nuts", "Dairy", "Shellfish", "Eggs", "Soy", "Wheat", "Fish", "Gluten"], rng.randint(0, 2)),
+        "cooking_preference": rng.choice(["No preference", "Cooked meals", "No-cook/quick meals"]),
+        "calories": rng.choice([1500, 2000, 2500]),
+        "goal": rng.choice(["Weight loss", "Muscle gain", "Maintenance"])
+    }
+
+def bench_plan_cache(count, requests, profiles):
+    """Repeat submits drawn from a pool of profiles, uncached versus through the rule plan cache"""
+    recipes = synthetic_recipe_frame(count)
+    rng = random.Random(7)
+    pool = [random_preferences(rng) for _ in range(profiles)]
+    submits = [rng.choice(pool) for _ in range(requests)]
+
+    start = time.perf_counter()
+    for preferences in submits:
+        rules.filter_recipes(recipes, preferences)
+    uncached_time = time.perf_counter() - start
+
+    cache = rules.RulePlanCache()
+    start = time.perf_counter()
+    for preferences in submits:
+        cache.filter(recipes, preferences, catalog_version=1, recipes_key="bench")
+    cached_time = time.perf_counter() - start
+
+    stats = cache.stats()["results"]
+    print(f"{requests} submits from {len(pool)} profiles over {count} recipes")
+    print(f"uncached {uncached_time:.3f} s, cached {cached_time:.3f} s ({uncached_time / cached_time:.1f}x), "
+          f"result hit rate {stats['hit_rate']:.1%}")
+
+def bench_batch(count, users):
+    """One filter_recipes call per user versus filter_recipes_batch over the same profiles"""
+    recipes = synthetic_recipe_frame(count)
+    rng = random.Random(13)
+    profiles = [random_preferences(rng) for _ in range(users)]
+    distinct = len({rules.preferences_key(preferences) for preferences in profiles})
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        looped = [rules.filter_recipes(recipes, preferences) for preferences in profiles]
+        looped_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = rules.filter_recipes_batch(recipes, profiles)
+        batched_time = time.perf_counter() - start
+        # Selection alone, without building the result records
+        plans = [rules.RulePlan(rules.create_rules_from_preferences(preferences)) for preferences in profiles]
+        start = time.perf_counter()
+        for plan in plans:
+            plan.evaluate(rules.RecipeColumns(recipes))
+        looped_select = time.perf_counter() - start
+        start = time.perf_counter()
+        rules.evaluate_plans(plans, rules.RecipeColumns(recipes))
+        batched_select = time.perf_counter() - start
+    if looped != batched:
+        raise AssertionError("filter_recipes_batch disagrees with per-user filter_recipes")
+
+    print(f"{users} users ({distinct} distinct profiles) over {count} recipes")
+    print(f"{'':<12}{'per-user s':>12}{'batch s':>10}{'speedup':>10}")
+    print(f"{'selection':<12}{looped_select:>12.3f}{batched_select:>10.3f}{looped_select / batched_select:>9.1f}x")
+    print(f"{'end to end':<12}{looped_time:>12.3f}{batched_time:>10.3f}{looped_time / batched_time:>9.1f}x")
+
+def bench_rule_profile(count, requests):
+    """Static versus profiled, selectivity-ordered rule tiers, then the per-rule report"""
+    recipes = synthetic_recipe_frame(count)
+    rng = random.Random(17)
+    profiles = [random_preferences(rng) for _ in range(requests)]
+    plans = [rules.RulePlan(rules.create_rules_from_preferences(preferences)) for preferences in profiles]
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [plan.evaluate(rules.RecipeColumns(recipes)) for plan in plans]
+
+    original = rules.RULE_PROFILING
+    try:
+        rules.RULE_PROFILING = False
+        start = time.perf_counter()
+        static = run()
+        static_time = time.perf_counter() - start
+
+        rules.RULE_PROFILING = True
+        rules.reset_rule_profile()
+        run()  # Warm-up pass collects the statistics the ordering uses
+        start = time.perf_counter()
+        adaptive = run()
+        adaptive_time = time.perf_counter() - start
+    finally:
+        rules.RULE_PROFILING = original
+    if any(not (np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])) for a, b in zip(static, adaptive)):
+        raise AssertionError("Adaptive rule ordering changed a result")
+
+    print(f"{requests} profiles over {count} recipes: static order {static_time:.3f} s, "
+          f"adaptive order {adaptive_time:.3f} s ({static_time / adaptive_time:.2f}x)")
+    print(f"{'rule':<40}{'evals':>8}{'total ms':>10}{'mean ms':>9}{'pass':>7}{'subset':>8}{'skipped':>9}")
+    for entry in rules.rule_profile_report():
+        name = f"{entry['rule_type']} {entry['condition']}"[:39]
+        pass_rate = f"{entry['pass_rate']:.0%}" if entry["pass_rate"] is not None else "-"
+        subset_rate = f"{entry['conditional_pass_rate']:.0%}" if entry["conditional_pass_rate"] is not None else "-"
+        print(f"{name:<40}{entry['evaluations']:>8}{entry['total_ms']:>10.1f}{entry['mean_ms']:>9.2f}"
+              f"{pass_rate:>7}{subset_rate:>8}{entry['short_circuits']:>9}")
+
+def bench_pushdown(count, profiles, limit=200):
+    """Rule filtering in Python over a diet-only page or the whole catalog, versus pushed down into SQLite"""
+    path = os.path.join(tempfile.mkdtemp(), "bench_pushdown.db")
+    print(f"Building {count} synthetic recipes in {path}")
+    build_synthetic_database(path, count)
+    database.close_connections()
+
+    rng = random.Random(11)
+    pool = [random_preferences(rng) for _ in range(profiles)]
+
+    def diet_page(preferences):
+        diet = preferences["diet_type"].lower() if preferences["diet_type"] != "No restrictions" else None
+        return rules.filter_recipes(database.get_recipes(limit, diet_type=diet), preferences)
+
+    def whole_catalog(preferences):
+        return rules.filter_recipes(database.get_recipes(count), preferences)
+
+    def pushdown(preferences):
+        recipe_rules = rules.create_rules_from_preferences(preferences)
+        return rules.filter_recipes(rules.query_recipes_with_rules(recipe_rules, database.get_recipes, limit), preferences)
+
+    print(f"{'strategy':<16}{'total ms':>10}{'matches':>10}")
+    for name, strategy in (("diet page", diet_page), ("whole catalog", whole_catalog), ("pushdown", pushdown)):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            matches = sum(len(strategy(preferences)) for preferences in pool)
+        print(f"{name:<16}{(time.perf_counter() - start) * 1000:>10.1f}{matches:>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the recipe database")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    indexes_parser = subparsers.add_parser("indexes", help="Query timings without/with the idx_* indexes")
+    indexes_parser.add_argument("--count", type=int, default=100000)
+
+    ingest_parser = subparsers.add_parser("ingest", help="End-to-end ingestion throughput against a fake Spoonacular")
+    ingest_parser.add_argument("--count", type=int, default=2000, help="Target recipes per run")
+    ingest_parser.add_argument("--modes", nargs="+", default=["sequential", "pipelined", "streaming"],
+                               choices=["sequential", "pipelined", "streaming"])
+    ingest_parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake API response")
+    ingest_parser.add_argument("--jitter", type=float, default=0.0)
+    ingest_parser.add_argument("--error-rate", type=float, default=0.0)
+    ingest_parser.add_argument("--quota", type=int, default=None, help="Calls before the fake API returns 402")
+
+    snapshot_parser = subparsers.add_parser("snapshot-reads", help="Read latency during a backfill, primary vs snapshots")
+    snapshot_parser.add_argument("--count", type=int, default=20000, help="Recipes in the database before the backfill")
+    snapshot_parser.add_argument("--target", type=int, default=3000, help="Recipes collected by the backfill")
+    snapshot_parser.add_argument("--latency", type=float, default=0.01)
+
+    rules_parser = subparsers.add_parser("rules", help="Row-wise vs vectorized rule filtering")
+    rules_parser.add_argument("--counts", type=int, nargs="+", default=[10000, 1000000])
+    rules_parser.add_argument("--rowwise-limit", type=int, default=None,
+                              help="Skip the slow row-wise reference above this many recipes")
+
+    allergens_parser = subparsers.add_parser("allergens", help="Allergy exclusion by scan vs inverted index")
+    allergens_parser.add_argument("--count", type=int, default=1000000)
+    allergens_parser.add_argument("--allergies", nargs="+", default=["Nuts", "Dairy", "Shellfish", "Eggs", "peanut"])
+
+    plan_cache_parser = subparsers.add_parser("plan-cache", help="Repeat profiles with and without the rule plan cache")
+    plan_cache_parser.add_argument("--count", type=int, default=10000)
+    plan_cache_parser.add_argument("--requests", type=int, default=500)
+    plan_cache_parser.add_argument("--profiles", type=int, default=25)
+
+    pushdown_parser = subparsers.add_parser("pushdown", help="Rule filtering in Python versus pushed down into SQL")
+    pushdown_parser.add_argument("--count", type=int, default=100000)
+    pushdown_parser.add_argument("--profiles", type=int, default=20)
+
+    macros_parser = subparsers.add_parser("macros", help="Nearest macro ratios by full scan vs grid index")
+    macros_parser.add_argument("--count", type=int, default=1000000)
+    macros_parser.add_argument("--k", type=int, default=10)
+    macros_parser.add_argument("--goals", nargs="+", default=["weight loss", "muscle gain", "heart health", "maintenance"])
+
+    batch_parser = subparsers.add_parser("batch", help="Per-user filter_recipes vs filter_recipes_batch")
+    batch_parser.add_argument("--count", type=int, default=20000)
+    batch_parser.add_argument("--users", type=int, default=300)
+
+    profile_parser = subparsers.add_parser("rule-profile", help="Per-rule profiling and adaptive rule ordering")
+    profile_parser.add_argument("--count", type=int, default=100000)
+    profile_parser.add_argument("--requests", type=int, default=200)
+
+    args = parser.parse_args()
+    if args.benchmark == "indexes":
+        bench_indexes(args.count)
+    elif args.benchmark == "ingest":
+        bench_ingest(args.count, args.modes, args.latency, args.jitter, args.error_rate, args.quota)
+    elif args.benchmark == "snapshot-reads":
+        bench_snapshot_reads(args.count, args.target, args.latency)
+    elif args.benchmark == "rules":
+        bench_rules(args.counts, args.rowwise_limit)
+    elif args.benchmark == "allergens":
+        bench_allergens(args.count, args.allergies)
+    elif args.benchmark == "plan-cache":
+        bench_plan_cache(args.count, args.requests, args.profiles)
+    elif args.benchmark == "pushdown":
+        bench_pushdown(args.count, args.profiles)
+    elif args.benchmark == "macros":
+        bench_macros(args.count, args.k, args.goals)
+    elif args.benchmark == "batch":
+        bench_batch(args.count, args.users)
+    elif args.benchmark == "rule-profile":
+        bench_rule_profile(args.count, args.requests)
@@ -1,12 +1,24 @@
 import requests
+import sys
 import time
 import os
 import json
+import codecs
+import copy
+import queue
+import re
 import sqlite3
+import threading
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
 from langchain.docstore.document import Document
+from lru_cache import LRUCache
+from response_cache import ResponseCache, decompress_payload, make_cache_key
 
 # Load environment variables
 load_dotenv()
@@ -16,10 +28,35 @@ SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
 
 # Constants for API optimization
 CACHE_DIR = "cache"
+CACHE_FILE_NAME = "responses.db"  # Single-file response cache inside CACHE_DIR
+CACHE_TTL = 7 * 24 * 3600  # Seconds before a cached API response is refetched
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # Compressed response cache budget
 DATABASE_FILE = "meal_recipes.db"
 MAX_BATCH_SIZE = 100  # Maximum recipes per API call
 API_DELAY = 1  # Seconds between API calls
 MAX_DAILY_CALLS = 150  # Free tier limit
+WRITE_BATCH_SIZE = 500  # Recipes per transaction in bulk writes
+STATEMENT_CACHE_SIZE = 256  # Prepared statements cached per connection
+FETCH_WORKERS = 4  # Concurrent fetchers in pipelined ingestion
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes read per chunk when streaming responses
+RECIPE_CACHE_SIZE = 4096  # Recipe detail records kept by get_recipes_by_ids
+EXPORT_CHUNK_SIZE = 10000  # Rows per chunk when exporting
+PUBLISH_READ_SNAPSHOTS = True  # Serve reads from immutable snapshots published after each bulk write; single writes retire them
+READ_SNAPSHOT_SUFFIX = ".snapshots"  # Directory next to DATABASE_FILE holding published read snapshots
+READ_SNAPSHOTS_KEPT = 2  # Published snapshots kept on disk, including the current one
+
+# Pragmas applied to every connection; WAL lets readers proceed during an ingest
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -65536,  # 64 MB
+    "mmap_size": 268435456,  # 256 MB
+    "temp_store": "MEMORY"
+}
+
+# Search endpoint (override to point ingestion at a local stand-in server)
+SPOONACULAR_API_URL = os.getenv("SPOONACULAR_API_URL", "https://api.spoonacular.com/recipes/complexSearch")
 
 # List of diet types to search for
 DIET_TYPES = [
@@ -33,31 +70,276 @@ MEAL_TYPES = [
     "salad", "bread", "breakfast", "soup", "beverage", "sauce", "snack"
 ]
 
+# Per-thread pooled connections, keyed by database path
+_thread_local = threading.local()
+
+# Last pointer file read by get_read_database: (pointer path, inode, mtime) -> snapshot path
+_read_snapshot_pointer = {}
+
+def connect_database(path=None):
+    """Open a new tuned SQLite connection"""
+    conn = sqlite3.connect(
+        path or DATABASE_FILE, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False
+    )
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    return conn
+
+def connect_snapshot(path):
+    """Open a read-only connection to a published snapshot"""
+    # Snapshots never change once published, so SQLite can skip locking and change detection
+    conn = sqlite3.connect(
+        Path(path).absolute().as_uri() + "?immutable=1", uri=True,
+        cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False
+    )
+    for pragma in ("cache_size", "mmap_size", "temp_store"):
+        conn.execute(f"PRAGMA {pragma}={SQLITE_PRAGMAS[pragma]}")
+    return conn
+
+def get_snapshot_dir():
+    """Directory holding published read snapshots of DATABASE_FILE"""
+    return DATABASE_FILE + READ_SNAPSHOT_SUFFIX
+
+def get_read_database():
+    """Path readers should use: the latest published snapshot, or the primary database if none"""
+    if not PUBLISH_READ_SNAPSHOTS:
+        return DATABASE_FILE
+    pointer = os.path.join(get_snapshot_dir(), "CURRENT")
+    try:
+        stat = os.stat(pointer)
+    except OSError:
+        return DATABASE_FILE
+    
+    key = (pointer, stat.st_ino, stat.st_mtime_ns)
+    path = _read_snapshot_pointer.get(key)
+    if path is None:
+        try:
+            with open(pointer, "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except OSError:
+            return DATABASE_FILE
+        path = os.path.join(get_snapshot_dir(), name) if name else DATABASE_FILE
+        _read_snapshot_pointer.clear()
+        _read_snapshot_pointer[key] = path
+    return path
+
+def connect_reader(path):
+    """Open a new read connection to path, a published snapshot or the primary database"""
+    return connect_snapshot(path) if path != DATABASE_FILE else connect_database()
+
+def get_connection():
+    """Get the calling thread's pooled read connection, following the latest published snapshot"""
+    connections = getattr(_thread_local, "connections", None)
+    if connections is None:
+        connections = _thread_local.connections = {}
+    path = get_read_database()
+    conn = connections.get(path)
+    if conn is None:
+        # Let go of snapshots this thread read before the last publish
+        snapshot_dir = get_snapshot_dir()
+        for stale in [p for p in connections if p.startswith(snapshot_dir)]:
+            connections.pop(stale).close()
+        conn = connections[path] = connect_reader(path)
+    return conn
+
+@contextmanager
+def read_transaction():
+    """Dedicated read connection inside one transaction, so several queries see the same catalog version"""
+    conn = connect_reader(get_read_database())
+    try:
+        conn.execute("BEGIN")
+        yield conn
+    finally:
+        conn.close()
+
+def get_primary_connection():
+    """Get the calling thread's pooled connection to the writable primary database"""
+    connections = getattr(_thread_local, "connections", None)
+    if connections is None:
+        connections = _thread_local.connections = {}
+    conn = connections.get(DATABASE_FILE)
+    if conn is None:
+        conn = connections[DATABASE_FILE] = connect_database()
+    return conn
+
+def publish_read_snapshot():
+    """Copy the primary database into a new immutable snapshot and switch readers to it"""
+    directory = get_snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    
+    source = connect_database()
+    try:
+        version = get_catalog_version(source)
+        name = f"recipes-{version or 0}-{time.time_ns()}.db"
+        staging = os.path.join(directory, name + ".tmp")
+        target = sqlite3.connect(staging)
+        try:
+            # The online backup copies one consistent state even while writers keep going
+            source.backup(target)
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+    finally:
+        source.close()
+    os.replace(staging, os.path.join(directory, name))
+    
+    # Swapping the pointer file is the atomic publish step
+    pointer = os.path.join(directory, "CURRENT")
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer + ".tmp", pointer)
+    
+    # A single write that committed after the copy may have retired the pointer before the swap above
+    check = connect_database()
+    try:
+        if get_catalog_version(check) != version:
+            retire_read_snapshot()
+    finally:
+        check.close()
+    
+    # Older snapshots stay readable by open connections until they are removed
+    snapshots = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.startswith("recipes-") and entry.name.endswith(".db")),
+        key=lambda entry: entry.stat().st_mtime_ns
+    )
+    for entry in snapshots[:-READ_SNAPSHOTS_KEPT]:
+        if entry.name != name:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    return os.path.join(directory, name)
+
+def retire_read_snapshot():
+    """Point readers back at the primary database until the next publish"""
+    # Single-row writes do this instead of publishing, so they are visible at once without an O(catalog) copy
+    try:
+        os.remove(os.path.join(get_snapshot_dir(), "CURRENT"))
+    except FileNotFoundError:
+        pass
+    _read_snapshot_pointer.clear()
+
+def read_snapshot_published():
+    """Check whether readers are being served from a published snapshot"""
+    return get_read_database() != DATABASE_FILE
+
+def close_connections():
+    """Close the calling thread's pooled connections"""
+    connections = getattr(_thread_local, "connections", {})
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
 def setup_directories():
     """Create necessary directories if they don't exist"""
     if not os.path.exists(CACHE_DIR):
         os.makedirs(CACHE_DIR)
 
+# Shared response caches, keyed by cache file path
+_response_caches = {}
+_response_caches_lock = threading.Lock()
+
+def get_response_cache():
+    """Get the response cache for the current CACHE_DIR"""
+    path = os.path.join(CACHE_DIR, CACHE_FILE_NAME)
+    with _response_caches_lock:
+        if path not in _response_caches:
+            _response_caches[path] = ResponseCache(path, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES)
+        return _response_caches[path]
+
+def get_cache_key(category, meal_type, offset, number=MAX_BATCH_SIZE, min_calories=None, max_calories=None):
+    """Generate a cache key from every request parameter"""
+    return make_cache_key(
+        url=SPOONACULAR_API_URL, diet=category, type=meal_type, offset=offset,
+        number=number, min_calories=min_calories, max_calories=max_calories
+    )
+
+def save_to_cache(category, meal_type, offset, data, number=MAX_BATCH_SIZE, min_calories=None, max_calories=None):
+    """Save API response to cache"""
+    key = get_cache_key(category, meal_type, offset, number, min_calories, max_calories)
+    get_response_cache().put(key, data)
+
+def load_from_cache(category, meal_type, offset, number=MAX_BATCH_SIZE, min_calories=None, max_calories=None):
+    """Load API response from cache if available"""
+    key = get_cache_key(category, meal_type, offset, number, min_calories, max_calories)
+    return get_response_cache().get(key)
+
 def get_cache_path(category, meal_type, offset):
-    """Generate a cache file path based on query parameters"""
+    """Generate a legacy per-query cache file path"""
     safe_category = category.replace(" ", "_") if category else "none"
     safe_meal = meal_type.replace(" ", "_") if meal_type else "none"
     return os.path.join(CACHE_DIR, f"{safe_category}_{safe_meal}_{offset}.json")
 
-def save_to_cache(category, meal_type, offset, data):
-    """Save API response to cache"""
-    setup_directories()
-    cache_path = get_cache_path(category, meal_type, offset)
-    with open(cache_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f)
+def migrate_file_cache(remove=False):
+    """Import legacy per-query JSON cache files into the response cache"""
+    if not os.path.exists(CACHE_DIR):
+        return 0
+    
+    # Legacy names can't be split on "_" reliably, so match known query pairs
+    prefixes = {}
+    for category in DIET_TYPES + [None]:
+        for meal in MEAL_TYPES + [None]:
+            prefix = os.path.basename(get_cache_path(category, meal, 0))[:-len("_0.json")]
+            prefixes[prefix] = (category, meal)
+    
+    cache = get_response_cache()
+    migrated = 0
+    for filename in sorted(os.listdir(CACHE_DIR)):
+        if not filename.endswith(".json"):
+            continue
+        prefix, _, offset = filename[:-len(".json")].rpartition("_")
+        if prefix not in prefixes or not offset.isdigit():
+            print(f"Skipping unrecognized cache file {filename}")
+            continue
+        
+        category, meal = prefixes[prefix]
+        path = os.path.join(CACHE_DIR, filename)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable cache file {filename}: {e}")
+            continue
+        
+        # Legacy files were only written for default page size without calorie bounds
+        cache.put(get_cache_key(category, meal, int(offset)), data, created_at=os.path.getmtime(path))
+        migrated += 1
+        if remove:
+            os.remove(path)
+    
+    print(f"Migrated {migrated} cached responses into {cache.path}")
+    return migrated
 
-def load_from_cache(category, meal_type, offset):
-    """Load API response from cache if available"""
-    cache_path = get_cache_path(category, meal_type, offset)
-    if os.path.exists(cache_path):
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
+class TokenBucket:
+    """Thread-safe token bucket enforcing per-second and daily API call limits"""
+    def __init__(self, rate=None, capacity=1, daily_limit=MAX_DAILY_CALLS):
+        # rate is tokens per second; None disables the per-second limit
+        self.rate = rate if rate is not None else (1.0 / API_DELAY if API_DELAY else None)
+        self.capacity = capacity
+        self.daily_limit = daily_limit
+        self.tokens = capacity
+        self.calls = 0
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call may be made; returns False once the daily budget is spent"""
+        while True:
+            with self.lock:
+                if self.daily_limit is not None and self.calls >= self.daily_limit:
+                    return False
+                if self.rate is None:
+                    self.calls += 1
+                    return True
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.calls += 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
 def set_spoonacular_api_key(key):
     """Set Spoonacular API key (can be called from frontend)"""
@@ -66,22 +348,8 @@ def set_spoonacular_api_key(key):
     os.environ["SPOONACULAR_API_KEY"] = key
     return "API key set successfully"
 
-def fetch_recipes(category=None, meal_type=None, offset=0, number=MAX_BATCH_SIZE, min_calories=None, max_calories=None):
-    """Fetch recipes from Spoonacular API with caching and rate limiting"""
-    # Check if API key is available
-    if not SPOONACULAR_API_KEY:
-        print("Error: Spoonacular API key not found. Please set it before fetching recipes.")
-        return None, False
-        
-    # First check if we have this query cached
-    cached_data = load_from_cache(category, meal_type, offset)
-    if cached_data:
-        print(f"Using cached data for {category} {meal_type} (offset: {offset})")
-        return cached_data, False  # False indicates no API call was made
-    
-    # If not in cache, make API request
-    url = "https://api.spoonacular.com/recipes/complexSearch"
-    
+def build_search_params(category, meal_type, offset, number, min_calories, max_calories):
+    """Build complexSearch query parameters"""
     params = {
         "apiKey": SPOONACULAR_API_KEY,
         "addRecipeNutrition": True,
@@ -100,6 +368,29 @@ def fetch_recipes(category=None, meal_type=None, offset=0, number=MAX_BATCH_SIZE
         params["minCalories"] = min_calories
     if max_calories:
         params["maxCalories"] = max_calories
+    return params
+
+def fetch_recipes(category=None, meal_type=None, offset=0, number=MAX_BATCH_SIZE, min_calories=None, max_calories=None, rate_limiter=None):
+    """Fetch recipes from Spoonacular API with caching and rate limiting"""
+    # Check if API key is available
+    if not SPOONACULAR_API_KEY:
+        print("Error: Spoonacular API key not found. Please set it before fetching recipes.")
+        return None, False
+        
+    # First check if we have this query cached
+    cached_data = load_from_cache(category, meal_type, offset, number, min_calories, max_calories)
+    if cached_data:
+        print(f"Using cached data for {category} {meal_type} (offset: {offset})")
+        return cached_data, False  # False indicates no API call was made
+    
+    # If not in cache, make API request
+    url = SPOONACULAR_API_URL
+    params = build_search_params(category, meal_type, offset, number, min_calories, max_calories)
+    
+    # Wait for the shared rate limiter when fetching concurrently
+    if rate_limiter and not rate_limiter.acquire():
+        print(f"Reached daily limit of {MAX_DAILY_CALLS} API calls.")
+        return "LIMIT_REACHED", False
     
     print(f"Fetching from API: {category} {meal_type} (offset: {offset})")
     
@@ -117,13 +408,112 @@ def fetch_recipes(category=None, meal_type=None, offset=0, number=MAX_BATCH_SIZE
         
         # Cache successful response
         data = response.json()
-        save_to_cache(category, meal_type, offset, data)
+        save_to_cache(category, meal_type, offset, data, number, min_calories, max_calories)
         return data, True
         
     except Exception as e:
         print(f"Request failed: {e}")
         return None, True
 
+# Start of the top-level results array in a complexSearch response
+RESULTS_ARRAY_PATTERN = re.compile(r'"results"\s*:\s*\[')
+
+def iter_results(chunks):
+    """Yield each object of the "results" array as soon as its text has arrived"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    in_results = False
+    for chunk in chunks:
+        buffer += chunk
+        if not in_results:
+            match = RESULTS_ARRAY_PATTERN.search(buffer)
+            if not match:
+                continue
+            in_results = True
+            pos = match.end()
+        
+        while True:
+            # Skip separators between array items
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # Item is incomplete; wait for more data
+            yield item
+        
+        # Drop consumed text so memory stays at roughly one recipe
+        buffer = buffer[pos:]
+        pos = 0
+
+def stream_response_results(response, cache_key):
+    """Yield recipes from a streaming response, caching the page once fully read"""
+    # The raw body is compressed as it arrives, so the cached page never sits uncompressed in memory
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # gzip container
+    compressed = []
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    
+    def read_chunks():
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            compressed.append(compressor.compress(chunk))
+            yield text_decoder.decode(chunk)
+    
+    chunks = read_chunks()
+    try:
+        yield from iter_results(chunks)
+        
+        # Read the rest of the body (pagination fields) before caching
+        for _ in chunks:
+            pass
+        compressed.append(compressor.flush())
+        get_response_cache().put_compressed(cache_key, "gzip", b"".join(compressed))
+    finally:
+        response.close()
+
+def fetch_recipes_stream(category=None, meal_type=None, offset=0, number=MAX_BATCH_SIZE, min_calories=None, max_calories=None, rate_limiter=None):
+    """Like fetch_recipes, but returns an iterator of recipes parsed as the response downloads"""
+    if not SPOONACULAR_API_KEY:
+        print("Error: Spoonacular API key not found. Please set it before fetching recipes.")
+        return None, False
+    
+    cache_key = get_cache_key(category, meal_type, offset, number, min_calories, max_calories)
+    cached_data = get_response_cache().get(cache_key)
+    if cached_data:
+        print(f"Using cached data for {category} {meal_type} (offset: {offset})")
+        return iter(cached_data.get("results", [])), False
+    
+    params = build_search_params(category, meal_type, offset, number, min_calories, max_calories)
+    
+    if rate_limiter and not rate_limiter.acquire():
+        print(f"Reached daily limit of {MAX_DAILY_CALLS} API calls.")
+        return "LIMIT_REACHED", False
+    
+    print(f"Streaming from API: {category} {meal_type} (offset: {offset})")
+    
+    try:
+        response = requests.get(SPOONACULAR_API_URL, params=params, stream=True)
+        
+        if response.status_code == 402:
+            response.close()
+            print("Daily API limit reached.")
+            return "LIMIT_REACHED", True
+        
+        if response.status_code != 200:
+            print(f"Error: {response.status_code} - {response.text}")
+            response.close()
+            return None, True
+        
+        return stream_response_results(response, cache_key), True
+    
+    except Exception as e:
+        print(f"Request failed: {e}")
+        return None, True
+
 def determine_cooking_status(recipe):
     """Determine if a recipe requires cooking or not"""
     # Check if recipe requires cooking based on meal type or instructions
@@ -234,7 +624,7 @@ def extract_recipe_data(recipe):
 
 def create_database():
     """Create the SQLite database and tables"""
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = connect_database()
     cursor = conn.cursor()
     
     # Create recipes table
@@ -281,52 +671,570 @@ def create_database():
     ''')
     
     conn.commit()
+    
+    # Bring indexes and derived tables up to the current schema version
+    migrate_database(conn)
     return conn, cursor
 
-def save_to_database(recipe_data, ingredients, diet_tags):
-    """Save a recipe and its related data to the database"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+# Schema migrations applied in order by migrate_database. Each step is a SQL
+# statement or a callable taking the connection, and must be safe to re-run.
+SCHEMA_MIGRATIONS = [
+    (1, "Index ingredients and diet tags by recipe", [
+        # Covering indexes: joins and EXISTS subqueries never touch the base rows
+        "CREATE INDEX IF NOT EXISTS idx_ingredients_recipe_name ON ingredients (recipe_id, name)",
+        "CREATE INDEX IF NOT EXISTS idx_diet_tags_recipe_tag ON diet_tags (recipe_id, tag)"
+    ]),
+    (2, "Index hot recipe filters", [
+        "CREATE INDEX IF NOT EXISTS idx_recipes_meal_type ON recipes (meal_type)",
+        "CREATE INDEX IF NOT EXISTS idx_recipes_calories ON recipes (calories)",
+        "CREATE INDEX IF NOT EXISTS idx_recipes_cooking_calories ON recipes (cooking_status, calories)",
+        # Partial indexes for the cooking preferences offered in the app
+        "CREATE INDEX IF NOT EXISTS idx_recipes_cooked_calories ON recipes (calories) WHERE cooking_status = 'cooked'",
+        "CREATE INDEX IF NOT EXISTS idx_recipes_uncooked_calories ON recipes (calories) WHERE cooking_status = 'uncooked'",
+        "ANALYZE"
+    ]),
+    (3, "Full-text search index over titles, ingredients and tags", [
+        lambda conn: rebuild_search_index(conn)
+    ]),
+    (4, "Materialized recipe summary of ingredients and tags", [
+        '''
+        CREATE TABLE IF NOT EXISTS recipe_summary (
+            recipe_id INTEGER PRIMARY KEY,
+            diet_tags TEXT,
+            ingredients TEXT,
+            ingredient_details TEXT,
+            diet_tag_list TEXT,
+            ingredient_list TEXT
+        )
+        ''',
+        lambda conn: refresh_recipe_summary(conn)
+    ]),
+    (5, "Resumable backfill cursors", [
+        '''
+        CREATE TABLE IF NOT EXISTS ingest_cursors (
+            diet TEXT,
+            meal_type TEXT,
+            calorie_band TEXT,
+            next_offset INTEGER,
+            exhausted INTEGER DEFAULT 0,
+            updated_at TEXT,
+            PRIMARY KEY (diet, meal_type, calorie_band)
+        )
+        '''
+    ]),
+    (6, "Catalog version counter and change log", [
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at TEXT
+        )
+        ''',
+        "INSERT OR IGNORE INTO catalog_version (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)",
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            version INTEGER,
+            recipe_id INTEGER,
+            change TEXT,
+            PRIMARY KEY (version, recipe_id)
+        ) WITHOUT ROWID
+        '''
+    ]),
+    (7, "Interned ingredient dictionary and recipe ingredient ids", [
+        '''
+        CREATE TABLE IF NOT EXISTS ingredient_dictionary (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS recipe_ingredient_ids (
+            recipe_id INTEGER,
+            ingredient_id INTEGER,
+            PRIMARY KEY (recipe_id, ingredient_id)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_recipe_ingredient_ids_ingredient ON recipe_ingredient_ids (ingredient_id, recipe_id)",
+        lambda conn: refresh_ingredient_links(conn)
+    ])
+]
+
+def table_exists(conn, name):
+    """Check whether a table (or virtual table) exists"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+def fts5_available(conn):
+    """Check whether this SQLite build supports FTS5"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+# Pre-joined strings match the GROUP_CONCAT output the read paths used to build;
+# the *_list columns hold the same data as JSON arrays
+RECIPE_SUMMARY_SELECT = '''
+SELECT r.id,
+       (SELECT GROUP_CONCAT(DISTINCT tag) FROM diet_tags WHERE recipe_id = r.id),
+       (SELECT GROUP_CONCAT(DISTINCT name) FROM ingredients WHERE recipe_id = r.id),
+       (SELECT GROUP_CONCAT(DISTINCT name || ' (' || amount || ' ' || unit || ')')
+        FROM ingredients WHERE recipe_id = r.id),
+       (SELECT json_group_array(tag)
+        FROM (SELECT tag FROM diet_tags WHERE recipe_id = r.id ORDER BY id)),
+       (SELECT json_group_array(json_object('name', name, 'amount', amount, 'unit', unit))
+        FROM (SELECT name, amount, unit FROM ingredients WHERE recipe_id = r.id ORDER BY id))
+FROM recipes r
+'''
+
+def refresh_recipe_summary(conn, recipe_ids=None):
+    """Rebuild recipe_summary rows for the given recipe ids, or for every recipe"""
+    insert = '''
+    INSERT OR REPLACE INTO recipe_summary
+    (recipe_id, diet_tags, ingredients, ingredient_details, diet_tag_list, ingredient_list)
+    ''' + RECIPE_SUMMARY_SELECT
+    if recipe_ids is None:
+        conn.execute("DELETE FROM recipe_summary")
+        conn.execute(insert)
+    else:
+        conn.executemany(insert + " WHERE r.id = ?", [(recipe_id,) for recipe_id in recipe_ids])
+
+def load_json_list(value):
+    """Decode a JSON array column, treating NULL as empty"""
+    return json.loads(value) if isinstance(value, str) else []
+
+def rebuild_search_index(conn):
+    """Create and repopulate the recipes_fts index from the stored recipes"""
+    if not fts5_available(conn):
+        print("FTS5 is not available; search will use substring matching.")
+        return False
     
-    # Insert recipe
-    cursor.execute('''
-    INSERT OR REPLACE INTO recipes 
-    (id, title, image, source_url, ready_in_minutes, servings, calories, protein, carbs, fat, fiber, summary, cooking_status, category, meal_type)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        recipe_data["id"], recipe_data["title"], recipe_data["image"], 
-        recipe_data["source_url"], recipe_data["ready_in_minutes"], 
-        recipe_data["servings"], recipe_data["calories"], recipe_data["protein"],
-        recipe_data["carbs"], recipe_data["fat"], recipe_data["fiber"],
-        recipe_data["summary"], recipe_data["cooking_status"], recipe_data["category"],
-        recipe_data["meal_type"]
-    ))
-    
-    # Delete existing ingredients and tags before inserting new ones
-    cursor.execute('DELETE FROM ingredients WHERE recipe_id = ?', (recipe_data["id"],))
-    cursor.execute('DELETE FROM diet_tags WHERE recipe_id = ?', (recipe_data["id"],))
-    
-    # Insert ingredients
-    for ingredient in ingredients:
-        cursor.execute('''
-        INSERT INTO ingredients (recipe_id, name, amount, unit)
-        VALUES (?, ?, ?, ?)
-        ''', (
-            recipe_data["id"], ingredient["name"], ingredient["amount"], ingredient["unit"]
-        ))
-    
-    # Insert diet tags
-    for tag in diet_tags:
-        cursor.execute('''
-        INSERT INTO diet_tags (recipe_id, tag)
-        VALUES (?, ?)
-        ''', (recipe_data["id"], tag))
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        title, ingredients, tags, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''')
+    conn.execute("DELETE FROM recipes_fts")
+    conn.execute('''
+    INSERT INTO recipes_fts (rowid, title, ingredients, tags)
+    SELECT r.id, r.title,
+           (SELECT GROUP_CONCAT(name, ' ') FROM ingredients WHERE recipe_id = r.id),
+           REPLACE(COALESCE(r.category, ''), ',', ' ') || ' ' ||
+           COALESCE((SELECT GROUP_CONCAT(tag, ' ') FROM diet_tags WHERE recipe_id = r.id), '')
+    FROM recipes r
+    ''')
+    return True
+
+def canonical_ingredient_name(name):
+    """Lowercased, whitespace-normalized ingredient name used as the dictionary key"""
+    return " ".join(name.lower().split()) if isinstance(name, str) else ""
+
+def intern_ingredients(conn, names, known=None):
+    """Map canonical ingredient names to dictionary ids, adding new names"""
+    ids = {} if known is None else known
+    new_names = [name for name in dict.fromkeys(names) if name and name not in ids]
+    if new_names:
+        conn.executemany(
+            "INSERT OR IGNORE INTO ingredient_dictionary (name) VALUES (?)",
+            [(name,) for name in new_names]
+        )
+        rows = conn.execute(
+            "SELECT name, id FROM ingredient_dictionary WHERE name IN (SELECT value FROM json_each(?))",
+            (json.dumps(new_names),)
+        )
+        ids.update(rows)
+    return ids
+
+def refresh_ingredient_links(conn, recipe_ids=None):
+    """Rebuild recipe_ingredient_ids for the given recipe ids, or for every recipe"""
+    if recipe_ids is None:
+        rows = conn.execute("SELECT recipe_id, name FROM ingredients").fetchall()
+        conn.execute("DELETE FROM recipe_ingredient_ids")
+    else:
+        id_list = json.dumps([int(recipe_id) for recipe_id in recipe_ids])
+        rows = conn.execute(
+            "SELECT recipe_id, name FROM ingredients WHERE recipe_id IN (SELECT value FROM json_each(?))",
+            (id_list,)
+        ).fetchall()
+        conn.execute(
+            "DELETE FROM recipe_ingredient_ids WHERE recipe_id IN (SELECT value FROM json_each(?))",
+            (id_list,)
+        )
+
+    canonical = [(recipe_id, canonical_ingredient_name(name)) for recipe_id, name in rows]
+    ids = intern_ingredients(conn, [name for _, name in canonical])
+    conn.executemany(
+        "INSERT OR IGNORE INTO recipe_ingredient_ids (recipe_id, ingredient_id) VALUES (?, ?)",
+        [(recipe_id, ids[name]) for recipe_id, name in canonical if name]
+    )
+
+def get_schema_version(conn):
+    """Get the highest applied schema migration version"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def migrate_database(conn=None):
+    """Apply pending schema migrations and return the resulting version"""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_database()
     
-    conn.commit()
-    conn.close()
+    try:
+        version = get_schema_version(conn)
+        applied = False
+        for target, description, steps in SCHEMA_MIGRATIONS:
+            if target <= version:
+                continue
+            
+            # Each migration commits atomically with its version row; the legacy sqlite3
+            # transaction handling doesn't open a transaction for DDL, so manage it explicitly
+            isolation_level = conn.isolation_level
+            conn.isolation_level = None
+            try:
+                conn.execute("BEGIN")
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (target, description)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.isolation_level = isolation_level
+            print(f"Applied schema migration {target}: {description}")
+            version = target
+            applied = True
+        
+        # Keep a published read snapshot on the current schema
+        if applied and read_snapshot_published():
+            publish_read_snapshot()
+        return version
+    finally:
+        if own_conn:
+            conn.close()
+
+# Position of a (diet, meal type, calorie band) backfill; diet/meal None means unfiltered
+IngestCursor = namedtuple("IngestCursor", "diet meal_type calorie_band next_offset exhausted")
+
+def calorie_band(min_calories=None, max_calories=None):
+    """Cursor key for a calorie range"""
+    return f"{min_calories or ''}-{max_calories or ''}"
+
+def load_ingest_cursors(min_calories=None, max_calories=None):
+    """Map (diet, meal_type) to its saved cursor for a calorie band"""
+    conn = get_primary_connection()
+    rows = conn.execute('''
+    SELECT diet, meal_type, calorie_band, next_offset, exhausted
+    FROM ingest_cursors
+    WHERE calorie_band = ?
+    ''', (calorie_band(min_calories, max_calories),)).fetchall()
+    cursors = {}
+    for diet, meal, band, next_offset, exhausted in rows:
+        cursors[(diet or None, meal or None)] = IngestCursor(diet or None, meal or None, band, next_offset, bool(exhausted))
+    return cursors
+
+def reset_ingest_cursors():
+    """Forget backfill progress so the next collection starts from offset 0"""
+    conn = get_primary_connection()
+    with conn:
+        conn.execute("DELETE FROM ingest_cursors")
+
+def bump_catalog_version(conn):
+    """Advance the catalog version and return it; call inside the data transaction"""
+    conn.execute("UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1")
+    return conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+
+def record_catalog_changes(conn, changes):
+    """Bump the catalog version and log (recipe_id, change) pairs; call inside the data transaction"""
+    if not changes:
+        return None
+    version = bump_catalog_version(conn)
+    conn.executemany(
+        "INSERT OR REPLACE INTO catalog_changes (version, recipe_id, change) VALUES (?, ?, ?)",
+        [(version, recipe_id, change) for recipe_id, change in changes]
+    )
+    return version
+
+def get_catalog_version(conn=None):
+    """Current catalog version, or None if the database predates the change log"""
+    conn = conn or get_connection()
+    try:
+        row = conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def get_catalog_changes(since_version, conn=None):
+    """Recipes changed after since_version, as (current_version, {recipe_id: change})"""
+    conn = conn or get_connection()
+    version = get_catalog_version(conn)
+    changes = {}
+    rows = conn.execute('''
+    SELECT recipe_id, change FROM catalog_changes
+    WHERE version > ? AND version <= ?
+    ORDER BY version
+    ''', (since_version, version))
+    for recipe_id, change in rows:
+        # A recipe inserted and then updated within the window is still new to the caller
+        if changes.get(recipe_id) == "insert" and change == "update":
+            continue
+        changes[recipe_id] = change
+    return version, changes
+
+def prune_catalog_changes(before_version):
+    """Drop change log entries at or below before_version"""
+    conn = get_primary_connection()
+    with conn:
+        cursor = conn.execute("DELETE FROM catalog_changes WHERE version <= ?", (before_version,))
+    return cursor.rowcount
+
+def load_recipe_ids():
+    """Load the ids of every stored recipe for duplicate checks"""
+    conn = get_primary_connection()
+    return {row[0] for row in conn.execute("SELECT id FROM recipes")}
+
+class RecipeWriter:
+    """Bulk writer that saves extracted recipes over one connection in batched transactions"""
+    def __init__(self, batch_size=WRITE_BATCH_SIZE, defer_derived=False, publish=False):
+        self.conn = connect_database()
+        self.batch_size = batch_size
+        # Bulk paths publish a read snapshot on close; single saves retire it, as a full copy is too costly
+        self.publish = publish
+        # Bulk loads rebuild the summary and search index once on close instead of per batch
+        self.defer_derived = defer_derived
+        self.pending = {}
+        self.pending_cursors = {}
+        self.recipes_written = 0
+        self.rows_written = 0
+        self.failed_ids = []  # Recipes from batches that failed to write
+        self.started = time.monotonic()
+        self.search_index = table_exists(self.conn, "recipes_fts")
+        self.summary = table_exists(self.conn, "recipe_summary")
+        self.change_log = table_exists(self.conn, "catalog_changes")
+        self.ingredient_links = table_exists(self.conn, "recipe_ingredient_ids")
+        # Canonical ingredient name -> dictionary id, grown as batches commit
+        self.ingredient_ids = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
-def collect_recipes(target_count=20, diet_type=None, meal_type=None, min_calories=None, max_calories=None):
+    def add(self, recipe_data, ingredients, diet_tags):
+        """Queue a recipe for writing, committing once a full batch is pending"""
+        # Keyed by id so a recipe seen twice in one batch is only written once
+        self.pending[recipe_data["id"]] = (recipe_data, ingredients, diet_tags)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def save_cursor(self, cursor):
+        """Queue a backfill cursor so it commits together with the recipes before it"""
+        self.pending_cursors[(cursor.diet, cursor.meal_type, cursor.calorie_band)] = cursor
+        if not self.pending:
+            self.flush()
+
+    def flush(self):
+        """Write all pending recipes in a single transaction"""
+        if not self.pending and not self.pending_cursors:
+            return
+        
+        records = list(self.pending.values())
+        recipe_rows = [(
+            r["id"], r["title"], r["image"], r["source_url"], r["ready_in_minutes"],
+            r["servings"], r["calories"], r["protein"], r["carbs"], r["fat"], r["fiber"],
+            r["summary"], r["cooking_status"], r["category"], r["meal_type"]
+        ) for r, _, _ in records]
+        id_rows = [(r["id"],) for r, _, _ in records]
+        ingredient_rows = [
+            (r["id"], ingredient["name"], ingredient["amount"], ingredient["unit"])
+            for r, ingredients, _ in records for ingredient in ingredients
+        ]
+        tag_rows = [(r["id"], tag) for r, _, tags in records for tag in tags]
+        link_names = [
+            (r["id"], canonical_ingredient_name(ingredient["name"]))
+            for r, ingredients, _ in records for ingredient in ingredients
+        ]
+        ingredient_ids = self.ingredient_ids
+        
+        try:
+            with self.conn:
+                # Log each recipe as new or replaced under a fresh catalog version
+                if self.change_log and records:
+                    existing = {row[0] for row in self.conn.execute(
+                        "SELECT id FROM recipes WHERE id IN (SELECT value FROM json_each(?))",
+                        (json.dumps(list(self.pending.keys())),)
+                    )}
+                    record_catalog_changes(self.conn, [
+                        (recipe_id, "update" if recipe_id in existing else "insert")
+                        for recipe_id in self.pending
+                    ])
+
+                self.conn.executemany('''
+                INSERT OR REPLACE INTO recipes
+                (id, title, image, source_url, ready_in_minutes, servings, calories, protein, carbs, fat, fiber, summary, cooking_status, category, meal_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', recipe_rows)
+            
+                # Delete existing ingredients and tags before inserting new ones
+                self.conn.executemany('DELETE FROM ingredients WHERE recipe_id = ?', id_rows)
+                self.conn.executemany('DELETE FROM diet_tags WHERE recipe_id = ?', id_rows)
+            
+                self.conn.executemany('''
+                INSERT INTO ingredients (recipe_id, name, amount, unit)
+                VALUES (?, ?, ?, ?)
+                ''', ingredient_rows)
+                self.conn.executemany('''
+                INSERT INTO diet_tags (recipe_id, tag)
+                VALUES (?, ?)
+                ''', tag_rows)
+
+                if self.ingredient_links:
+                    # Work on a copy so ids from a rolled-back batch never reach the cache
+                    ingredient_ids = intern_ingredients(
+                        self.conn, [name for _, name in link_names], dict(self.ingredient_ids)
+                    )
+                    self.conn.executemany('DELETE FROM recipe_ingredient_ids WHERE recipe_id = ?', id_rows)
+                    self.conn.executemany(
+                        'INSERT OR IGNORE INTO recipe_ingredient_ids (recipe_id, ingredient_id) VALUES (?, ?)',
+                        [(recipe_id, ingredient_ids[name]) for recipe_id, name in link_names if name]
+                    )
+
+                if self.summary and not self.defer_derived:
+                    refresh_recipe_summary(self.conn, self.pending.keys())
+
+                # Keep the full-text index in step with the rows just written
+                if self.search_index and not self.defer_derived:
+                    search_rows = [(
+                        r["id"], r["title"], " ".join(ingredient["name"] for ingredient in ingredients),
+                        " ".join(r["category"].split(",") + list(tags))
+                    ) for r, ingredients, tags in records]
+                    self.conn.executemany('DELETE FROM recipes_fts WHERE rowid = ?', id_rows)
+                    self.conn.executemany(
+                        'INSERT INTO recipes_fts (rowid, title, ingredients, tags) VALUES (?, ?, ?, ?)',
+                        search_rows
+                    )
+
+                self.conn.executemany('''
+                INSERT OR REPLACE INTO ingest_cursors (diet, meal_type, calorie_band, next_offset, exhausted, updated_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', [(
+                    c.diet or "", c.meal_type or "", c.calorie_band, c.next_offset, int(c.exhausted)
+                ) for c in self.pending_cursors.values()])
+        except Exception as e:
+            # Drop the failed batch, and the cursors that depend on it, so later flushes don't retry it
+            print(f"Error writing batch of {len(records)} recipes: {e}")
+            self.failed_ids.extend(self.pending.keys())
+            self.pending = {}
+            self.pending_cursors = {}
+            return
+
+        self.ingredient_ids = ingredient_ids
+        self.recipes_written += len(records)
+        self.rows_written += len(recipe_rows) + len(ingredient_rows) + len(tag_rows)
+        self.pending = {}
+        self.pending_cursors = {}
+
+    def rows_per_second(self):
+        """Rows written per second since the writer was opened"""
+        elapsed = time.monotonic() - self.started
+        return self.rows_written / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        """Flush remaining recipes and close the connection"""
+        try:
+            self.flush()
+            if self.defer_derived and self.recipes_written:
+                with self.conn:
+                    if self.summary:
+                        refresh_recipe_summary(self.conn)
+                    if self.search_index:
+                        rebuild_search_index(self.conn)
+                    # Readers keyed on the version may have cached summaries from before the rebuild
+                    if self.change_log:
+                        bump_catalog_version(self.conn)
+        finally:
+            self.conn.close()
+        
+        # Readers switch to the new catalog only once everything written is complete
+        if PUBLISH_READ_SNAPSHOTS and self.recipes_written:
+            if self.publish:
+                publish_read_snapshot()
+            else:
+                retire_read_snapshot()
+
+    def report(self):
+        """Print write throughput"""
+        print(f"Wrote {self.recipes_written} recipes ({self.rows_written} rows) at {self.rows_per_second():.0f} rows/sec")
+
+def delete_recipes(recipe_ids):
+    """Delete recipes with their ingredients, tags and derived rows"""
+    conn = get_primary_connection()
+    id_rows = [(int(recipe_id),) for recipe_id in dict.fromkeys(recipe_ids)]
+    try:
+        with conn:
+            existing = [row[0] for row in conn.execute(
+                "SELECT id FROM recipes WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps([row[0] for row in id_rows]),)
+            )]
+            if table_exists(conn, "catalog_changes"):
+                record_catalog_changes(conn, [(recipe_id, "delete") for recipe_id in existing])
+            for table in ("ingredients", "diet_tags"):
+                conn.executemany(f"DELETE FROM {table} WHERE recipe_id = ?", id_rows)
+            if table_exists(conn, "recipe_ingredient_ids"):
+                conn.executemany("DELETE FROM recipe_ingredient_ids WHERE recipe_id = ?", id_rows)
+            if table_exists(conn, "recipe_summary"):
+                conn.executemany("DELETE FROM recipe_summary WHERE recipe_id = ?", id_rows)
+            if table_exists(conn, "recipes_fts"):
+                conn.executemany("DELETE FROM recipes_fts WHERE rowid = ?", id_rows)
+            conn.executemany("DELETE FROM recipes WHERE id = ?", id_rows)
+        if existing and PUBLISH_READ_SNAPSHOTS:
+            retire_read_snapshot()
+        return len(existing)
+    except Exception as e:
+        print(f"Error deleting recipes: {e}")
+        return 0
+
+def save_recipes_batch(records, batch_size=WRITE_BATCH_SIZE, defer_derived=False):
+    """Save a sequence of (recipe_data, ingredients, diet_tags) records in bulk"""
+    with RecipeWriter(batch_size=batch_size, defer_derived=defer_derived, publish=True) as writer:
+        for recipe_data, ingredients, diet_tags in records:
+            writer.add(recipe_data, ingredients, diet_tags)
+    writer.report()
+    return writer.recipes_written
+
+def save_to_database(recipe_data, ingredients, diet_tags):
+    """Save a recipe and its related data to the database"""
+    # Visible to every reader at once: readers fall back to the primary until the next bulk write publishes
+    with RecipeWriter(batch_size=1) as writer:
+        writer.add(recipe_data, ingredients, diet_tags)
+
+def collect_recipes(target_count=20, diet_type=None, meal_type=None, min_calories=None, max_calories=None, pipelined=False, streaming=False, resume=True, skip_existing=True):
     """Collect recipes from API and store in database"""
+    if pipelined:
+        return collect_recipes_pipelined(
+            target_count, diet_type, meal_type, min_calories, max_calories,
+            streaming=streaming, resume=resume, skip_existing=skip_existing
+        )
+    
+    # Streaming mode extracts and writes each recipe while the page is still downloading
+    fetch = fetch_recipes_stream if streaming else fetch_recipes
+    
     setup_directories()
     create_database()
     
@@ -335,15 +1243,25 @@ def collect_recipes(target_count=20, diet_type=None, meal_type=None, min_calorie
     collected_count = 0
     offset = 0
     
+    # Saved cursors let an interrupted backfill continue where it stopped
+    band = calorie_band(min_calories, max_calories)
+    cursors = load_ingest_cursors(min_calories, max_calories) if resume else {}
+    known_ids = load_recipe_ids() if skip_existing else set()
+    
     # If specific diet_type and meal_type are provided, only fetch those
     diet_types_to_fetch = [diet_type] if diet_type else DIET_TYPES
     meal_types_to_fetch = [meal_type] if meal_type else MEAL_TYPES
     
+    writer = RecipeWriter(publish=True)
+    limit_reached = False
     try:
         for diet in diet_types_to_fetch:
+            # A 402 means the quota is spent for every query, not just this one
+            if limit_reached:
+                break
             for meal in meal_types_to_fetch:
                 # Check if we've collected enough recipes
-                if collected_count >= target_count:
+                if collected_count >= target_count or limit_reached:
                     break
                 
                 # Check if we've hit the API call limit
@@ -351,10 +1269,14 @@ def collect_recipes(target_count=20, diet_type=None, meal_type=None, min_calorie
                     print(f"Reached daily limit of {MAX_DAILY_CALLS} API calls.")
                     break
                 
-                offset = 0
+                cursor = cursors.get((diet, meal))
+                if cursor and cursor.exhausted:
+                    continue
+                offset = cursor.next_offset if cursor else 0
+                
                 while collected_count < target_count and api_calls < MAX_DAILY_CALLS:
                     # Fetch recipes
-                    recipes_data, api_call_made = fetch_recipes(
+                    recipes_data, api_call_made = fetch(
                         diet, meal, offset, min_calories=min_calories, max_calories=max_calories
                     )
                     
@@ -365,64 +1287,296 @@ def collect_recipes(target_count=20, diet_type=None, meal_type=None, min_calorie
                         time.sleep(API_DELAY)
                     
                     if recipes_data == "LIMIT_REACHED":
+                        limit_reached = True
                         break
                     
-                    if not recipes_data or "results" not in recipes_data or not recipes_data["results"]:
+                    if not recipes_data:
                         print(f"No more {diet} {meal} recipes found.")
                         break
                     
                     # Process each recipe
-                    for recipe in recipes_data["results"]:
-                        try:
-                            # Extract and save recipe data
-                            recipe_data, ingredients, diet_tags = extract_recipe_data(recipe)
-                            save_to_database(recipe_data, ingredients, diet_tags)
-                            collected_count += 1
+                    results = recipes_data if streaming else recipes_data.get("results", [])
+                    page_count = 0
+                    page_done = False
+                    try:
+                        for recipe in results:
+                            page_count += 1
+                            
+                            # Skip recipes already stored (the same id shows up under several diets)
+                            if skip_existing:
+                                if recipe.get("id") in known_ids:
+                                    continue
+                                known_ids.add(recipe.get("id"))
                             
-                            # Print progress
-                            if collected_count % 10 == 0:
-                                print(f"Collected {collected_count} recipes")
+                            try:
+                                # Extract and save recipe data
+                                recipe_data, ingredients, diet_tags = extract_recipe_data(recipe)
+                                writer.add(recipe_data, ingredients, diet_tags)
+                                collected_count += 1
+                                
+                                # Print progress
+                                if collected_count % 10 == 0:
+                                    print(f"Collected {collected_count} recipes")
+                                
+                                # Check if we've collected enough recipes
+                                if collected_count >= target_count:
+                                    break
                             
-                            # Check if we've collected enough recipes
-                            if collected_count >= target_count:
-                                break
-                        
-                        except Exception as e:
-                            print(f"Error processing recipe {recipe['id']}: {e}")
-                            continue
+                            except Exception as e:
+                                print(f"Error processing recipe {recipe['id']}: {e}")
+                                continue
+                        else:
+                            page_done = True
+                    except (requests.RequestException, ValueError) as e:
+                        # Dropped connections, undecodable bytes or malformed JSON end this page only
+                        print(f"Stream interrupted for {diet} {meal} (offset: {offset}): {e}")
+                        break
+                    
+                    if page_count == 0:
+                        print(f"No more {diet} {meal} recipes found.")
+                        writer.save_cursor(IngestCursor(diet, meal, band, offset, True))
+                        break
+                    
+                    # Only advance the cursor past pages that were fully processed
+                    if page_done:
+                        writer.save_cursor(IngestCursor(diet, meal, band, offset + MAX_BATCH_SIZE, False))
                     
                     # Update offset for next batch
                     offset += MAX_BATCH_SIZE
-        
-        print(f"Collection complete. Total recipes: {collected_count}")
-        print(f"API calls made: {api_calls}")
+    
+    except KeyboardInterrupt:
+        print("\nCollection interrupted by user.")
         return collected_count
+    finally:
+        # Commit the pending batch and cursors however the loop ends
+        writer.close()
+    
+    writer.report()
+    print(f"Collection complete. Total recipes: {collected_count}")
+    print(f"API calls made: {api_calls}")
+    return collected_count
+
+def collect_recipes_pipelined(target_count=20, diet_type=None, meal_type=None, min_calories=None, max_calories=None, workers=FETCH_WORKERS, streaming=False, resume=True, skip_existing=True):
+    """Collect recipes with concurrent fetch, extract and write stages"""
+    setup_directories()
+    create_database()
+    
+    rate_limiter = TokenBucket()
+    stop = threading.Event()  # Target reached or interrupted: drop everything still queued
+    quota_exhausted = threading.Event()  # No more API calls, but pages already fetched are still stored
+    pages = queue.Queue(maxsize=workers)
+    records = queue.Queue(maxsize=MAX_BATCH_SIZE)
+    
+    band = calorie_band(min_calories, max_calories)
+    cursors = load_ingest_cursors(min_calories, max_calories) if resume else {}
+    known_ids = load_recipe_ids() if skip_existing else set()
+    
+    diet_types_to_fetch = [diet_type] if diet_type else DIET_TYPES
+    meal_types_to_fetch = [meal_type] if meal_type else MEAL_TYPES
+    pairs = [(diet, meal) for diet in diet_types_to_fetch for meal in meal_types_to_fetch]
+    
+    def fetch_pair(diet, meal):
+        # Walk the offsets of one diet/meal pair until it runs dry
+        cursor = cursors.get((diet, meal))
+        if cursor and cursor.exhausted:
+            return
+        offset = cursor.next_offset if cursor else 0
+        
+        fetch = fetch_recipes_stream if streaming else fetch_recipes
+        while not stop.is_set() and not quota_exhausted.is_set():
+            recipes_data, _ = fetch(
+                diet, meal, offset, min_calories=min_calories, max_calories=max_calories,
+                rate_limiter=rate_limiter
+            )
+            if recipes_data == "LIMIT_REACHED":
+                quota_exhausted.set()
+                break
+            
+            page_count = 0
+            page_done = False
+            try:
+                if streaming and recipes_data:
+                    # Hand recipes to the extract stage one at a time as they are parsed
+                    for recipe in recipes_data:
+                        pages.put([recipe])
+                        page_count += 1
+                        if stop.is_set():
+                            break
+                    else:
+                        page_done = True
+                elif recipes_data and recipes_data.get("results"):
+                    pages.put(recipes_data["results"])
+                    page_count = len(recipes_data["results"])
+                    page_done = True
+            except (requests.RequestException, ValueError) as e:
+                # Dropped connections, undecodable bytes or malformed JSON end this pair, not the whole stage
+                print(f"Stream interrupted for {diet} {meal} (offset: {offset}): {e}")
+                break
+            
+            if page_count == 0:
+                print(f"No more {diet} {meal} recipes found.")
+                if recipes_data is not None:
+                    pages.put(IngestCursor(diet, meal, band, offset, True))
+                break
+            
+            # Cursors travel behind their page so they commit after its recipes
+            if page_done:
+                pages.put(IngestCursor(diet, meal, band, offset + MAX_BATCH_SIZE, False))
+            offset += MAX_BATCH_SIZE
+    
+    def fetch_stage():
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(fetch_pair, diet, meal) for diet, meal in pairs]:
+                    future.result()
+        except Exception as e:
+            print(f"Fetch stage failed: {e}")
+        finally:
+            pages.put(None)
+    
+    def extract_stage():
+        while True:
+            page = pages.get()
+            if page is None:
+                break
+            # Keep draining after a stop so fetchers never block on a full queue
+            if stop.is_set():
+                continue
+            if isinstance(page, IngestCursor):
+                records.put(page)
+                continue
+            for recipe in page:
+                # Skip recipes already stored or already in flight
+                if skip_existing:
+                    if recipe.get("id") in known_ids:
+                        continue
+                    known_ids.add(recipe.get("id"))
+                try:
+                    records.put(extract_recipe_data(recipe))
+                except Exception as e:
+                    print(f"Error processing recipe {recipe.get('id')}: {e}")
+        records.put(None)
+    
+    threads = [
+        threading.Thread(target=fetch_stage, daemon=True),
+        threading.Thread(target=extract_stage, daemon=True)
+    ]
+    for thread in threads:
+        thread.start()
+    
+    # Write stage runs on the calling thread
+    writer = RecipeWriter(publish=True)
+    collected_count = 0
+    try:
+        while True:
+            record = records.get()
+            if record is None:
+                break
+            if collected_count >= target_count:
+                continue
+            if isinstance(record, IngestCursor):
+                writer.save_cursor(record)
+                continue
+            try:
+                writer.add(*record)
+                collected_count += 1
+            except Exception as e:
+                print(f"Error saving recipe {record[0]['id']}: {e}")
+                continue
+            
+            if collected_count % 10 == 0:
+                print(f"Collected {collected_count} recipes")
+            
+            if collected_count >= target_count:
+                stop.set()
+        
+        for thread in threads:
+            thread.join()
     
     except KeyboardInterrupt:
         print("\nCollection interrupted by user.")
         return collected_count
+    finally:
+        # Let the other stages wind down, then commit the pending batch and cursors however the loop ends
+        stop.set()
+        writer.close()
+    
+    writer.report()
+    print(f"Collection complete. Total recipes: {collected_count}")
+    print(f"API calls made: {rate_limiter.calls}")
+    return collected_count
 
-def get_recipes(limit=100, diet_type=None, meal_type=None, cooking_status=None, min_calories=None, max_calories=None):
-    """Get recipes from database with optional filtering"""
-    conn = sqlite3.connect(DATABASE_FILE)
+def extract_cached_page(entry):
+    """Decode one cached page and extract its recipes (runs in a worker process)"""
+    kind, source, codec = entry
+    try:
+        if kind == "file":
+            with open(source, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = decompress_payload(codec, source)
+    except (OSError, ValueError) as e:
+        print(f"Skipping unreadable cached page: {e}")
+        return []
     
-    # Build query with optional filters
-    query = '''
+    records = []
+    for recipe in data.get("results", []) if isinstance(data, dict) else []:
+        try:
+            records.append(extract_recipe_data(recipe))
+        except Exception as e:
+            print(f"Error processing recipe {recipe.get('id')}: {e}")
+    return records
+
+def iter_cached_pages():
+    """Yield every cached page, from the response cache and any legacy JSON files"""
+    cache_path = os.path.join(CACHE_DIR, CACHE_FILE_NAME)
+    if os.path.exists(cache_path):
+        for codec, payload in get_response_cache().iter_payloads():
+            yield ("blob", payload, codec)
+    
+    if os.path.exists(CACHE_DIR):
+        for filename in sorted(os.listdir(CACHE_DIR)):
+            if filename.endswith(".json"):
+                yield ("file", os.path.join(CACHE_DIR, filename), None)
+
+def rebuild_from_cache(workers=None, batch_size=WRITE_BATCH_SIZE):
+    """Rebuild the database from cached API responses without any network access"""
+    create_database()
+    
+    # Pages are decoded and extracted in parallel; a single writer does all the I/O
+    imported = 0
+    seen_ids = set()
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        with RecipeWriter(batch_size=batch_size, defer_derived=True, publish=True) as writer:
+            for records in executor.map(extract_cached_page, iter_cached_pages(), chunksize=4):
+                for recipe_data, ingredients, diet_tags in records:
+                    # The same recipe is cached under several diets
+                    if recipe_data["id"] in seen_ids:
+                        continue
+                    seen_ids.add(recipe_data["id"])
+                    writer.add(recipe_data, ingredients, diet_tags)
+                    imported += 1
+    
+    writer.report()
+    print(f"Rebuilt {imported} recipes from cache in {time.monotonic() - started:.1f}s")
+    return imported
+
+# Columns returned by recipe list queries
+RECIPE_LIST_COLUMNS = '''
     SELECT r.id, r.title as name, r.image, r.calories, r.protein, r.carbs, r.fat, r.fiber, 
-           r.cooking_status, r.category, r.meal_type,
-           GROUP_CONCAT(DISTINCT dt.tag) as diet_tags,
-           GROUP_CONCAT(DISTINCT i.name) as ingredients
+           r.cooking_status, r.category, r.meal_type, s.diet_tags, s.ingredients
     FROM recipes r
-    LEFT JOIN diet_tags dt ON r.id = dt.recipe_id
-    LEFT JOIN ingredients i ON r.id = i.recipe_id
-    '''
-    
-    # Add WHERE clause if filters are provided
+    LEFT JOIN recipe_summary s ON s.recipe_id = r.id
+'''
+
+def build_recipe_filters(diet_type=None, meal_type=None, cooking_status=None, min_calories=None, max_calories=None):
+    """Build WHERE clauses and parameters for the recipe list filters"""
     where_clauses = []
     params = []
     
     if diet_type:
-        where_clauses.append("(r.category LIKE ? OR EXISTS (SELECT 1 FROM diet_tags WHERE recipe_id = r.id AND tag LIKE ?))")
+        where_clauses.append("(r.category LIKE ? OR s.diet_tags LIKE ?)")
         params.extend([f"%{diet_type}%", f"%{diet_type}%"])
     
     if meal_type:
@@ -441,41 +1595,112 @@ def get_recipes(limit=100, diet_type=None, meal_type=None, cooking_status=None,
         where_clauses.append("r.calories <= ?")
         params.append(max_calories)
     
+    return where_clauses, params
+
+def get_recipes(limit=100, diet_type=None, meal_type=None, cooking_status=None, min_calories=None, max_calories=None, filters=None, conn=None):
+    """Get recipes from database with optional filtering; filters adds (where_clauses, params) over r and s"""
+    conn = conn or get_connection()
+    
+    # Build query with optional filters
+    query = RECIPE_LIST_COLUMNS
+    where_clauses, params = build_recipe_filters(diet_type, meal_type, cooking_status, min_calories, max_calories)
+    if filters:
+        where_clauses += filters[0]
+        params += filters[1]
+    
     if where_clauses:
         query += " WHERE " + " AND ".join(where_clauses)
     
-    # Group by and limit
-    query += " GROUP BY r.id LIMIT ?"
+    # Order by id and limit
+    query += " ORDER BY r.id LIMIT ?"
     params.append(limit)
     
     try:
         df = pd.read_sql_query(query, conn, params=params)
-        conn.close()
         return df
     except Exception as e:
         print(f"Error querying database: {e}")
-        conn.close()
         return pd.DataFrame()
 
+def iter_recipes(chunk_size=1000, diet_type=None, meal_type=None, cooking_status=None, min_calories=None, max_calories=None, as_records=False, conn=None):
+    """Yield every matching recipe in id order, chunk_size at a time; reads through conn if given"""
+    # Otherwise a dedicated connection: the pooled one is closed when a new snapshot is published mid-iteration
+    owned = conn is None
+    if owned:
+        conn = connect_reader(get_read_database())
+    where_clauses, params = build_recipe_filters(diet_type, meal_type, cooking_status, min_calories, max_calories)
+    
+    # Keyset pagination: each chunk resumes after the last id seen, so cost per chunk stays flat
+    query = RECIPE_LIST_COLUMNS + " WHERE " + " AND ".join(["r.id > ?"] + where_clauses)
+    query += " ORDER BY r.id LIMIT ?"
+    
+    last_id = None
+    try:
+        while True:
+            chunk_params = [last_id if last_id is not None else -2**63] + params + [chunk_size]
+            if as_records:
+                # Plain dicts skip the DataFrame overhead
+                cursor = conn.execute(query, chunk_params)
+                columns = [column[0] for column in cursor.description]
+                chunk = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                if not chunk:
+                    return
+                last_id = chunk[-1]["id"]
+            else:
+                chunk = pd.read_sql_query(query, conn, params=chunk_params)
+                if chunk.empty:
+                    return
+                last_id = int(chunk["id"].iloc[-1])
+            
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+    finally:
+        if owned:
+            conn.close()
+
+def build_fts_query(query):
+    """Turn free text into an FTS5 MATCH expression of prefix terms"""
+    terms = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
 def search_recipes(query, limit=20, min_calories=None, max_calories=None):
-    """Search recipes by name or ingredients"""
+    """Search recipes by name, ingredients or tags, best matches first"""
     if not query:
         return get_recipes(limit=limit, min_calories=min_calories, max_calories=max_calories)
     
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_connection()
+    match = build_fts_query(query)
     
-    search_query = '''
-    SELECT r.id, r.title as name, r.image, r.calories, r.protein, r.carbs, r.fat, r.fiber, 
-           r.cooking_status, r.category, r.meal_type,
-           GROUP_CONCAT(DISTINCT dt.tag) as diet_tags,
-           GROUP_CONCAT(DISTINCT i.name) as ingredients
-    FROM recipes r
-    LEFT JOIN diet_tags dt ON r.id = dt.recipe_id
-    LEFT JOIN ingredients i ON r.id = i.recipe_id
-    WHERE (r.title LIKE ? OR EXISTS (SELECT 1 FROM ingredients WHERE recipe_id = r.id AND name LIKE ?))
-    '''
-    
-    params = [f"%{query}%", f"%{query}%"]
+    # Fall back to substring matching when FTS5 isn't compiled in
+    if match and table_exists(conn, "recipes_fts"):
+        # BM25 weights: title matches count most, then ingredients, then tags
+        # Materialized so bm25() runs in a plain full-text query, not the join
+        search_query = '''
+        WITH f AS MATERIALIZED (
+            SELECT rowid AS recipe_id, bm25(recipes_fts, 10.0, 5.0, 2.0) AS score
+            FROM recipes_fts
+            WHERE recipes_fts MATCH ?
+        )
+        SELECT r.id, r.title as name, r.image, r.calories, r.protein, r.carbs, r.fat, r.fiber, 
+               r.cooking_status, r.category, r.meal_type, s.diet_tags, s.ingredients
+        FROM f
+        JOIN recipes r ON r.id = f.recipe_id
+        LEFT JOIN recipe_summary s ON s.recipe_id = r.id
+        WHERE 1 = 1
+        '''
+        params = [match]
+        order_by = " ORDER BY f.score"
+    else:
+        search_query = '''
+        SELECT r.id, r.title as name, r.image, r.calories, r.protein, r.carbs, r.fat, r.fiber, 
+               r.cooking_status, r.category, r.meal_type, s.diet_tags, s.ingredients
+        FROM recipes r
+        LEFT JOIN recipe_summary s ON s.recipe_id = r.id
+        WHERE (r.title LIKE ? OR EXISTS (SELECT 1 FROM ingredients WHERE recipe_id = r.id AND name LIKE ?))
+        '''
+        params = [f"%{query}%", f"%{query}%"]
+        order_by = " ORDER BY r.id"
     
     # Add calorie filters if provided
     if min_calories is not None:
@@ -486,110 +1711,272 @@ def search_recipes(query, limit=20, min_calories=None, max_calories=None):
         search_query += " AND r.calories <= ?"
         params.append(max_calories)
     
-    search_query += " GROUP BY r.id LIMIT ?"
+    search_query += order_by + " LIMIT ?"
     params.append(limit)
     
     try:
         df = pd.read_sql_query(search_query, conn, params=params)
-        conn.close()
         return df
     except Exception as e:
         print(f"Error searching database: {e}")
-        conn.close()
         return pd.DataFrame()
 
+def get_ingredient_dictionary():
+    """Map every interned ingredient id to its canonical name"""
+    conn = get_connection()
+    try:
+        return dict(conn.execute("SELECT id, name FROM ingredient_dictionary"))
+    except Exception as e:
+        print(f"Error loading ingredient dictionary: {e}")
+        return {}
+
+def find_ingredient_ids(substring):
+    """Ids of dictionary ingredients whose canonical name contains substring"""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT id FROM ingredient_dictionary WHERE instr(name, ?) > 0", (substring.lower(),)
+        )
+        return {row[0] for row in rows}
+    except Exception as e:
+        print(f"Error searching ingredient dictionary: {e}")
+        return set()
+
+def get_recipe_ids_with_ingredients(ingredient_ids):
+    """Ids of recipes using any of the given ingredient ids"""
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+        SELECT DISTINCT recipe_id FROM recipe_ingredient_ids
+        WHERE ingredient_id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps([int(ingredient_id) for ingredient_id in ingredient_ids]),))
+        return {row[0] for row in rows}
+    except Exception as e:
+        print(f"Error looking up recipes by ingredient: {e}")
+        return set()
+
+def get_recipe_ingredient_ids(recipe_ids=None):
+    """Map recipe ids (or every recipe) to their sets of ingredient ids"""
+    conn = get_connection()
+    query = "SELECT recipe_id, ingredient_id FROM recipe_ingredient_ids"
+    params = ()
+    if recipe_ids is not None:
+        query += " WHERE recipe_id IN (SELECT value FROM json_each(?))"
+        params = (json.dumps([int(recipe_id) for recipe_id in recipe_ids]),)
+
+    links = {}
+    try:
+        for recipe_id, ingredient_id in conn.execute(query, params):
+            links.setdefault(recipe_id, set()).add(ingredient_id)
+    except Exception as e:
+        print(f"Error loading recipe ingredient ids: {e}")
+    return links
+
 def count_recipes():
     """Count the number of recipes in the database"""
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("SELECT COUNT(*) FROM recipes")
     count = cursor.fetchone()[0]
     
-    conn.close()
     return count
 
-def get_recipe_by_id(recipe_id):
-    """Get a specific recipe by ID with all details"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    
-    # Get recipe details
-    recipe_query = '''
-    SELECT r.id, r.title as name, r.image, r.source_url, r.ready_in_minutes, r.servings,
-           r.calories, r.protein, r.carbs, r.fat, r.fiber, r.summary,
-           r.cooking_status, r.category, r.meal_type
-    FROM recipes r
-    WHERE r.id = ?
-    '''
-    
-    # Get ingredients
-    ingredients_query = '''
-    SELECT name, amount, unit
-    FROM ingredients
-    WHERE recipe_id = ?
-    '''
-    
-    # Get diet tags
-    tags_query = '''
-    SELECT tag
-    FROM diet_tags
-    WHERE recipe_id = ?
-    '''
+_recipe_detail_cache = LRUCache(RECIPE_CACHE_SIZE)
+
+def get_database_version(conn=None):
+    """Cheap token that changes whenever the catalog changes; pass conn to read it inside that connection's transaction"""
+    catalog_version = get_catalog_version(conn)
+    if catalog_version is not None:
+        return (os.path.abspath(DATABASE_FILE), catalog_version)
+
+    # Without the change log, fall back to file stamps: commits append to the WAL and checkpoints rewrite the main file
+    version = [DATABASE_FILE]
+    for path in (DATABASE_FILE, DATABASE_FILE + "-wal"):
+        try:
+            stat = os.stat(path)
+            version.extend([stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            version.extend([0, 0])
+    return tuple(version)
+
+def get_recipes_by_ids(recipe_ids, use_cache=True):
+    """Get full details for many recipes in one query, in the order requested"""
+    version = get_database_version()
+    # Ids that aren't integers can't match a recipe, as with the old per-id lookup
+    requested = []
+    for recipe_id in recipe_ids:
+        try:
+            requested.append(int(recipe_id))
+        except (ValueError, TypeError):
+            continue
+    found = {}
+    missing = []
+    for recipe_id in dict.fromkeys(requested):
+        cached = _recipe_detail_cache.get((recipe_id, version)) if use_cache else None
+        if cached is not None:
+            found[recipe_id] = cached
+        else:
+            missing.append(recipe_id)
     
-    try:
-        recipe_df = pd.read_sql_query(recipe_query, conn, params=[recipe_id])
-        
-        if recipe_df.empty:
-            conn.close()
-            return None
-        
-        ingredients_df = pd.read_sql_query(ingredients_query, conn, params=[recipe_id])
-        tags_df = pd.read_sql_query(tags_query, conn, params=[recipe_id])
+    if missing:
+        conn = get_connection()
         
-        # Convert to dictionary
-        recipe = recipe_df.iloc[0].to_dict()
-        recipe['ingredients'] = ingredients_df.to_dict('records')
-        recipe['diet_tags'] = tags_df['tag'].tolist() if not tags_df.empty else []
+        # Recipe details with pre-joined ingredient and tag arrays; ids travel as one JSON parameter
+        query = '''
+        SELECT r.id, r.title as name, r.image, r.source_url, r.ready_in_minutes, r.servings,
+               r.calories, r.protein, r.carbs, r.fat, r.fiber, r.summary,
+               r.cooking_status, r.category, r.meal_type,
+               s.ingredient_list, s.diet_tag_list
+        FROM recipes r
+        LEFT JOIN recipe_summary s ON s.recipe_id = r.id
+        WHERE r.id IN (SELECT value FROM json_each(?))
+        '''
         
-        conn.close()
-        return recipe
-    except Exception as e:
-        print(f"Error getting recipe {recipe_id}: {e}")
-        conn.close()
-        return None
+        try:
+            cursor = conn.execute(query, (json.dumps(missing),))
+            columns = [column[0] for column in cursor.description]
+            for row in cursor:
+                recipe = dict(zip(columns, row))
+                recipe['ingredients'] = load_json_list(recipe.pop('ingredient_list'))
+                recipe['diet_tags'] = load_json_list(recipe.pop('diet_tag_list'))
+                found[recipe['id']] = recipe
+                if use_cache:
+                    _recipe_detail_cache.put((recipe['id'], version), recipe)
+        except Exception as e:
+            print(f"Error getting recipes {missing[:5]}...: {e}")
+    
+    # Deep copies keep callers from mutating cached records, including their ingredient and tag lists
+    return [copy.deepcopy(found[recipe_id]) for recipe_id in requested if recipe_id in found]
 
-def export_to_csv(filename="recipes_export.csv"):
-    """Export database to CSV for backup or analysis"""
-    conn = sqlite3.connect(DATABASE_FILE)
+def get_recipe_by_id(recipe_id):
+    """Get a specific recipe by ID with all details"""
+    recipes = get_recipes_by_ids([recipe_id])
+    return recipes[0] if recipes else None
+
+def export_to_csv(filename="recipes_export.csv", chunk_size=EXPORT_CHUNK_SIZE):
+    """Export database to CSV for backup or analysis, streaming chunk_size rows at a time"""
+    conn = get_connection()
     
     query = '''
     SELECT r.id, r.title, r.image, r.source_url, r.ready_in_minutes, r.servings,
            r.calories, r.protein, r.carbs, r.fat, r.fiber,
            r.cooking_status, r.category, r.meal_type,
-           GROUP_CONCAT(DISTINCT dt.tag) as diet_tags,
-           GROUP_CONCAT(DISTINCT i.name || ' (' || i.amount || ' ' || i.unit || ')') as ingredients
+           s.diet_tags, s.ingredient_details as ingredients
     FROM recipes r
-    LEFT JOIN diet_tags dt ON r.id = dt.recipe_id
-    LEFT JOIN ingredients i ON r.id = i.recipe_id
-    GROUP BY r.id
+    LEFT JOIN recipe_summary s ON s.recipe_id = r.id
+    ORDER BY r.id
     '''
     
     try:
-        df = pd.read_sql_query(query, conn)
-        df.to_csv(filename, index=False)
-        print(f"Exported {len(df)} recipes to {filename}")
-        conn.close()
+        exported = 0
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+                chunk.to_csv(f, header=exported == 0, index=False)
+                exported += len(chunk)
+        print(f"Exported {exported} recipes to {filename}")
         return True
     except Exception as e:
         print(f"Error exporting to CSV: {e}")
-        conn.close()
         return False
 
+# Full-fidelity catalog rows: every recipe column plus nested ingredients and tags
+CATALOG_QUERY = '''
+SELECT r.id, r.title, r.image, r.source_url, r.ready_in_minutes, r.servings,
+       r.calories, r.protein, r.carbs, r.fat, r.fiber, r.summary,
+       r.cooking_status, r.category, r.meal_type,
+       s.ingredient_list, s.diet_tag_list
+FROM recipes r
+LEFT JOIN recipe_summary s ON s.recipe_id = r.id
+ORDER BY r.id
+'''
+
+def catalog_schema(pa):
+    """Arrow schema for catalog exports"""
+    return pa.schema([
+        ("id", pa.int64()), ("title", pa.string()), ("image", pa.string()), ("source_url", pa.string()),
+        ("ready_in_minutes", pa.int64()), ("servings", pa.int64()), ("calories", pa.int64()),
+        ("protein", pa.float64()), ("carbs", pa.float64()), ("fat", pa.float64()), ("fiber", pa.float64()),
+        ("summary", pa.string()), ("cooking_status", pa.string()), ("category", pa.string()),
+        ("meal_type", pa.string()),
+        ("ingredients", pa.list_(pa.struct([("name", pa.string()), ("amount", pa.float64()), ("unit", pa.string())]))),
+        ("diet_tags", pa.list_(pa.string()))
+    ])
+
+def export_catalog(filename="recipes_export.parquet", chunk_size=EXPORT_CHUNK_SIZE):
+    """Export the full catalog to Parquet, or Arrow IPC for .arrow/.feather names"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Error: pyarrow is required for Parquet/Arrow export.")
+        return False
+    
+    conn = get_connection()
+    schema = catalog_schema(pa)
+    use_ipc = filename.endswith((".arrow", ".feather"))
+    
+    try:
+        exported = 0
+        sink = pa.ipc.new_file(filename, schema) if use_ipc else pq.ParquetWriter(filename, schema)
+        with sink:
+            cursor = conn.execute(CATALOG_QUERY)
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                
+                # One row group / record batch per chunk keeps memory bounded
+                batch = [dict(zip(columns, row)) for row in rows]
+                for recipe in batch:
+                    recipe["ingredients"] = load_json_list(recipe.pop("ingredient_list"))
+                    recipe["diet_tags"] = load_json_list(recipe.pop("diet_tag_list"))
+                table = pa.Table.from_pylist(batch, schema=schema)
+                sink.write_table(table)
+                exported += len(batch)
+        print(f"Exported {exported} recipes to {filename}")
+        return True
+    except Exception as e:
+        print(f"Error exporting catalog: {e}")
+        return False
+
+def import_catalog(filename, batch_size=WRITE_BATCH_SIZE):
+    """Bulk-load a Parquet/Arrow catalog written by export_catalog into the database"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Error: pyarrow is required for Parquet/Arrow import.")
+        return 0
+    
+    create_database()
+    
+    if filename.endswith((".arrow", ".feather")):
+        reader = pa.ipc.open_file(filename)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = pq.ParquetFile(filename).iter_batches(batch_size=batch_size)
+    
+    recipe_columns = [name for name in catalog_schema(pa).names if name not in ("ingredients", "diet_tags")]
+    
+    def records():
+        for batch in batches:
+            for row in batch.to_pylist():
+                recipe_data = {name: row[name] for name in recipe_columns}
+                yield recipe_data, row["ingredients"] or [], row["diet_tags"] or []
+    
+    imported = save_recipes_batch(records(), batch_size=batch_size, defer_derived=True)
+    print(f"Imported {imported} recipes from {filename}")
+    return imported
+
 def initialize_database(min_recipes=50):
     """Initialize database with recipes if it's empty or has fewer than min_recipes"""
-    # Create database if it doesn't exist
+    # Create database if it doesn't exist, otherwise upgrade its schema
     if not os.path.exists(DATABASE_FILE):
         create_database()
+    else:
+        migrate_database()
     
     # Check if we have enough recipes
     recipe_count = count_recipes()
@@ -761,8 +2148,12 @@ def load_sample_recipes():
 
 # Main function to initialize the database
 if __name__ == "__main__":
+    # Offline rebuild needs neither an API key nor network access
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild-from-cache":
+        rebuild_from_cache()
+    
     # Check if API key is available
-    if not SPOONACULAR_API_KEY:
+    elif not SPOONACULAR_API_KEY:
         print("Warning: Spoonacular API key not found in environment variables.")
         print("Please set your API key using set_spoonacular_api_key() function or as an environment variable.")
         print("Using sample recipes instead.")
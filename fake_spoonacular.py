@@ -0,0 +1,255 @@
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from database import DIET_TYPES, MEAL_TYPES
+
+DEFAULT_RESULTS_PER_QUERY = 300  # Recipes available for each diet/meal type combination
+MAX_NUMBER = 100  # Spoonacular caps complexSearch pages at 100 results
+STREAM_CHUNK_SIZE = 16 * 1024  # Bytes written per chunk when simulating slow transfers
+
+# Vocabulary for synthetic recipes
+SYNTHETIC_INGREDIENTS = [
+    "olive oil", "garlic", "onion", "salt", "pepper", "butter", "chicken breast", "eggs",
+    "milk", "flour", "sugar", "tomatoes", "spinach", "rice", "quinoa", "chickpeas",
+    "almonds", "peanut butter", "cheddar cheese", "greek yogurt", "salmon", "shrimp",
+    "tofu", "black beans", "avocado", "lemon juice", "honey", "oats", "soy sauce", "walnuts"
+]
+SYNTHETIC_WORDS = ["Roasted", "Spicy", "Creamy", "Grilled", "Quick", "Hearty", "Fresh", "Baked", "Chicken", "Salmon"]
+SYNTHETIC_UNITS = ["g", "ml", "cup", "tbsp", "tsp", "oz", ""]
+
+def synthetic_recipe(recipe_id, rng=random, diet=None, meal_type=None):
+    """Build a Spoonacular-shaped recipe with plausible nutrition"""
+    protein = rng.uniform(2, 60)
+    carbs = rng.uniform(2, 90)
+    fat = rng.uniform(1, 45)
+    diets = rng.sample(DIET_TYPES, rng.randint(0, 3))
+    if diet and diet not in diets:
+        diets.append(diet)
+    ingredients = []
+    for name in rng.sample(SYNTHETIC_INGREDIENTS, rng.randint(4, 12)):
+        amount = round(rng.uniform(0.5, 500), 1)
+        unit = rng.choice(SYNTHETIC_UNITS)
+        ingredients.append({
+            "id": SYNTHETIC_INGREDIENTS.index(name) + 1000,
+            "name": name,
+            "original": f"{amount} {unit} {name}".replace("  ", " "),
+            "amount": amount,
+            "unit": unit
+        })
+    return {
+        "id": recipe_id,
+        "title": f"{rng.choice(SYNTHETIC_WORDS)} {rng.choice(SYNTHETIC_INGREDIENTS).title()} {recipe_id}",
+        "image": f"https://img.spoonacular.com/recipes/{recipe_id}-312x231.jpg",
+        "imageType": "jpg",
+        "readyInMinutes": rng.randint(5, 120),
+        "servings": rng.randint(1, 8),
+        "diets": diets,
+        "dishTypes": [meal_type or rng.choice(MEAL_TYPES)],
+        "nutrition": {"nutrients": [
+            {"name": "Calories", "amount": round(protein * 4 + carbs * 4 + fat * 9, 2), "unit": "kcal"},
+            {"name": "Protein", "amount": round(protein, 2), "unit": "g"},
+            {"name": "Carbohydrates", "amount": round(carbs, 2), "unit": "g"},
+            {"name": "Fat", "amount": round(fat, 2), "unit": "g"},
+            {"name": "Fiber", "amount": round(rng.uniform(0, 15), 2), "unit": "g"}
+        ]},
+        "extendedIngredients": ingredients
+    }
+
+def recipe_calories(recipe):
+    """Calories of a synthetic recipe"""
+    return recipe["nutrition"]["nutrients"][0]["amount"]
+
+@lru_cache(maxsize=256)
+def query_catalog(diet, meal_type, count, seed):
+    """Deterministic recipe list for one diet/meal type combination"""
+    # Ids are stable per query, so repeated runs and resumed backfills see the same catalog
+    key = zlib.crc32(f"{seed}|{diet}|{meal_type}".encode("utf-8"))
+    rng = random.Random(key)
+    base = (key % 100000) * 1000
+    return tuple(synthetic_recipe(base + i + 1, rng, diet, meal_type) for i in range(count))
+
+class FakeSpoonacularHandler(BaseHTTPRequestHandler):
+    """Serves /recipes/complexSearch from the owning FakeSpoonacular instance"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        # Streaming clients may hang up mid-body once they have what they need
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+
+        # Trickle large bodies out in chunks so streaming clients see partial data
+        delay = self.server.fake.chunk_delay
+        for start in range(0, len(payload), STREAM_CHUNK_SIZE):
+            self.wfile.write(payload[start:start + STREAM_CHUNK_SIZE])
+            if delay:
+                self.wfile.flush()
+                time.sleep(delay)
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        if not url.path.endswith("/recipes/complexSearch"):
+            self.send_json(404, {"status": "failure", "code": 404, "message": "Not found"})
+            return
+
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        status, body, headers = fake.handle_search(params)
+        self.send_json(status, body, headers)
+
+class FakeSpoonacular:
+    """Local stand-in for Spoonacular complexSearch with configurable latency, errors and quota"""
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, quota=None,
+                 results_per_query=DEFAULT_RESULTS_PER_QUERY, chunk_delay=0.0, seed=42):
+        self.host = host
+        self.port = port
+        self.latency = latency  # Seconds before each response starts
+        self.jitter = jitter  # Extra random latency, up to this many seconds
+        self.error_rate = error_rate  # Fraction of requests answered with a 500
+        self.quota = quota  # Successful calls allowed before every request gets a 402
+        self.results_per_query = results_per_query
+        self.chunk_delay = chunk_delay
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zero the request counters"""
+        self.requests = 0
+        self.served = 0
+        self.errors = 0
+        self.quota_rejections = 0
+        self.recipes_served = 0
+
+    @property
+    def url(self):
+        """complexSearch endpoint URL of the running server"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/recipes/complexSearch"
+
+    def handle_search(self, params):
+        """Answer one complexSearch request, returning (status, body, headers)"""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+            fail = self.error_rate and self.rng.random() < self.error_rate
+            over_quota = self.quota is not None and self.served >= self.quota
+            if over_quota:
+                self.quota_rejections += 1
+            elif fail:
+                self.errors += 1
+            else:
+                self.served += 1
+            used = self.served
+
+        if delay:
+            time.sleep(delay)
+
+        headers = {"X-API-Quota-Request": 1, "X-API-Quota-Used": used}
+        if over_quota:
+            return 402, {
+                "status": "failure", "code": 402,
+                "message": f"Your daily points limit of {self.quota} has been reached."
+            }, headers
+        if fail:
+            return 500, {"status": "failure", "code": 500, "message": "Internal server error"}, headers
+
+        try:
+            offset = int(params.get("offset", 0))
+            number = min(int(params.get("number", 10)), MAX_NUMBER)
+        except ValueError:
+            return 400, {"status": "failure", "code": 400, "message": "Invalid offset or number"}, headers
+
+        recipes = query_catalog(params.get("diet"), params.get("type"), self.results_per_query, self.seed)
+        min_calories = float(params["minCalories"]) if "minCalories" in params else None
+        max_calories = float(params["maxCalories"]) if "maxCalories" in params else None
+        if min_calories is not None or max_calories is not None:
+            recipes = [
+                recipe for recipe in recipes
+                if (min_calories is None or recipe_calories(recipe) >= min_calories)
+                and (max_calories is None or recipe_calories(recipe) <= max_calories)
+            ]
+
+        page = list(recipes[offset:offset + number])
+        with self.lock:
+            self.recipes_served += len(page)
+        return 200, {"results": page, "offset": offset, "number": number, "totalResults": len(recipes)}, headers
+
+    def start(self):
+        """Start serving on a background thread"""
+        self.server = ThreadingHTTPServer((self.host, self.port), FakeSpoonacularHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def stats(self):
+        """Request counters"""
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "served": self.served,
+                "errors": self.errors,
+                "quota_rejections": self.quota_rejections,
+                "recipes_served": self.recipes_served
+            }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake Spoonacular complexSearch server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--quota", type=int, default=None, help="Successful calls before returning 402")
+    parser.add_argument("--results-per-query", type=int, default=DEFAULT_RESULTS_PER_QUERY)
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between body chunks")
+    args = parser.parse_args()
+
+    fake = FakeSpoonacular(
+        args.host, args.port, args.latency, args.jitter, args.error_rate, args.quota,
+        args.results_per_query, args.chunk_delay
+    ).start()
+    print(f"Serving fake Spoonacular at {fake.url}")
+    print(f"Point the app at it with SPOONACULAR_API_URL={fake.url}")
+    try:
+        fake.thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
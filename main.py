@@ -13,10 +13,12 @@ import plotly.graph_objects as go
 from PIL import Image
 import matplotlib.pyplot as plt
 import itertools
+import functools
 
 # Import your modules
-from database import get_recipes, search_recipes, set_spoonacular_api_key, initialize_database, get_recipe_by_id, count_recipes
-from rules import create_rules_from_preferences, filter_recipes
+from database import get_recipes, search_recipes, set_spoonacular_api_key, initialize_database, get_recipe_by_id, count_recipes, get_database_version, read_transaction
+from rules import create_rules_from_preferences, filter_recipes_cached, query_recipes_with_rules, preferences_key
+from recipe_store import load_or_build_snapshot
 from embeddings import generate_embedding, find_similar_recipes
 
 # Load environment variables
@@ -287,16 +289,35 @@ def update_database(additional_recipes=100):  # Increased additional recipes
         st.error(f"Error updating database: {e}")
         return 0
 
-# Load recipes from database
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_recipe_database(diet_type=None, meal_type=None, limit=200):  # Increased limit
+# Columnar recipe snapshot, memory-mapped once per catalog version and shared read-only by all sessions
+@st.cache_resource(max_entries=1)
+def get_recipe_store(catalog_version=None):
+    return load_or_build_snapshot()
+
+# Load recipes from database; cached until the catalog version changes
+@st.cache_data(max_entries=64)
+def load_recipe_database(diet_type=None, meal_type=None, limit=200, catalog_version=None):  # Increased limit
     try:
-        return get_recipes(limit=limit, diet_type=diet_type, meal_type=meal_type)
+        store = get_recipe_store(catalog_version)
+        return store.to_dataframe(store.select(limit=limit, diet_type=diet_type, meal_type=meal_type))
     except Exception as e:
         st.error(f"Error loading recipes: {e}")
         # Return empty DataFrame as fallback
         return pd.DataFrame()
 
+# Load the recipes a preference profile can select, filtered by SQLite over the whole catalog
+# Returns (recipes, the catalog version they were read at); a cache miss may read a newer catalog than catalog_version
+@st.cache_data(max_entries=64)
+def load_matching_recipes(preferences, limit=200, catalog_version=None):
+    try:
+        with read_transaction() as conn:
+            query = functools.partial(get_recipes, conn=conn)
+            recipes = query_recipes_with_rules(create_rules_from_preferences(preferences), query, limit=limit)
+            return recipes, get_database_version(conn)
+    except Exception as e:
+        st.error(f"Error loading recipes: {e}")
+        return pd.DataFrame(), None
+
 # Function to find the best combination of meals to match calorie target
 def find_best_meal_combination(breakfast_recipes, lunch_recipes, dinner_recipes, snack_recipes, target_calories):
     # If any category is empty, fill with recipes from other categories
@@ -708,9 +729,6 @@ with tab1:
                 time.sleep(0.02)
                 progress_bar.progress(i + 1)
             
-            # Load recipes
-            recipes = load_recipe_database(diet_type=diet_type.lower() if diet_type != "No restrictions" else None)
-            
             # Prepare user preferences
             user_preferences = {
                 'diet_type': diet_type,
@@ -721,8 +739,18 @@ with tab1:
                 'plan_type': plan_type
             }
             
+            # SQLite applies every rule it can translate; the rest run on the rows it returns
+            catalog_version = get_database_version()
+            recipes, recipes_version = load_matching_recipes(user_preferences, catalog_version=catalog_version)
+            
             # Filter recipes based on preferences
-            filtered_recipes = filter_recipes(recipes, user_preferences)
+            # Identical profiles on the same catalog reuse the cached selection; the allergen index
+            # is only consulted when the store was built from the catalog version the recipes were read at
+            filtered_recipes = filter_recipes_cached(
+                recipes, user_preferences, recipes_version,
+                allergen_index=get_recipe_store(catalog_version).allergen_index,
+                recipes_key=("load_matching_recipes", preferences_key(user_preferences))
+            )
             
             if not filtered_recipes:
                 st.error("No recipes match your criteria. Please try adjusting your preferences.")
@@ -757,7 +785,7 @@ with tab2:
     st.write("Browse our collection of recipes with vibrant visuals and detailed information.")
     
     # Load recipes
-    recipes = load_recipe_database()
+    recipes = load_recipe_database(catalog_version=get_database_version())
     
     # Add colorful filters
     col1, col2, col3 = st.columns(3)
@@ -1062,8 +1090,6 @@ if st.sidebar.button("🔄 Update Database with More Recipes"):
             new_count = update_database(additional_recipes=100)  # Increased to 100
             if new_count > 0:
                 st.success(f"Successfully added new recipes! Database now contains {count_recipes()} recipes.")
-                # Clear cache to reload recipes
-                load_recipe_database.clear()
             else:
                 st.warning("No new recipes were added. This could be due to API limits or network issues.")
 
@@ -0,0 +1,452 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import database
+
+SNAPSHOT_DIR = "recipe_snapshot"
+NUMERIC_COLUMNS = ["calories", "protein", "carbs", "fat", "fiber"]
+CATEGORICAL_COLUMNS = ["meal_type", "cooking_status"]
+STRING_COLUMNS = ["name", "image", "category", "diet_tags", "ingredients"]
+RECORD_COLUMNS = [
+    "id", "name", "image", "calories", "protein", "carbs", "fat", "fiber",
+    "cooking_status", "category", "meal_type", "diet_tags", "ingredients"
+]
+
+# Ingredient substrings making up each allergen family
+ALLERGEN_FAMILIES = {
+    "nuts": ["almond", "cashew", "hazelnut", "macadamia", "nut", "pecan", "pistachio", "walnut"],
+    "dairy": ["butter", "casein", "cheese", "cream", "ghee", "milk", "whey", "yogurt", "yoghurt"],
+    "shellfish": ["clam", "crab", "lobster", "mussel", "oyster", "prawn", "scallop", "shrimp"],
+    "eggs": ["egg", "mayonnaise"],
+    "soy": ["edamame", "miso", "soy", "tempeh", "tofu"],
+    "wheat": ["bread", "couscous", "flour", "pasta", "semolina", "wheat"],
+    "fish": ["anchov", "cod", "fish", "halibut", "salmon", "sardine", "tilapia", "trout", "tuna"],
+    "gluten": ["barley", "bread", "couscous", "flour", "pasta", "rye", "seitan", "semolina", "wheat"]
+}
+MACRO_GRID_CELLS = 256  # Cells per axis of the protein/carbs calorie-fraction grid
+
+class StringColumn:
+    """Variable-length strings packed into one UTF-8 buffer plus offsets, so they can be memory-mapped"""
+    def __init__(self, offsets, data, nulls):
+        self.offsets = offsets
+        self.data = data
+        self.nulls = nulls
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [value.encode("utf-8") if isinstance(value, str) else b"" for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(item) for item in encoded])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        nulls = np.array([not isinstance(value, str) for value in values], dtype=bool)
+        return cls(offsets, data, nulls)
+
+    def __len__(self):
+        return len(self.nulls)
+
+    def __getitem__(self, index):
+        if self.nulls[index]:
+            return None
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+class AllergenIndex:
+    """Inverted index from lowercased ingredient-list segments to the recipe rows containing them"""
+    def __init__(self, ids, terms, offsets, rows, nulls, source_version=None):
+        self.ids = ids
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+        self.nulls = nulls
+        self.source_version = source_version  # Catalog version the ingredient strings were read at
+        self.term_list = None
+
+    @classmethod
+    def build(cls, ids, values, source_version=None):
+        """Index comma-joined ingredient strings, one per recipe id (ids sorted ascending)"""
+        postings = {}
+        for row, value in enumerate(values):
+            if isinstance(value, str):
+                for term in set(value.lower().split(",")):
+                    postings.setdefault(term, []).append(row)
+        term_list = sorted(postings)
+        offsets = np.zeros(len(term_list) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in term_list])
+        rows = np.array([row for term in term_list for row in postings[term]], dtype=np.int32)
+        nulls = np.array([not isinstance(value, str) for value in values], dtype=bool)
+        index = cls(np.asarray(ids, dtype=np.int64), StringColumn.from_values(term_list), offsets, rows, nulls, source_version)
+        index.term_list = term_list
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def contains_mask(self, needle):
+        """Rows whose lowercased ingredient string contains needle, or None if the index can't answer exactly"""
+        # A match could span the "," between names, and "" matches every string; leave those to a scan
+        if not needle or "," in needle:
+            return None
+        if self.term_list is None:
+            self.term_list = [self.terms[i] for i in range(len(self.terms))]
+
+        # Within one segment, a substring of the whole string is a substring of some segment
+        mask = np.zeros(len(self), dtype=bool)
+        for i, term in enumerate(self.term_list):
+            if needle in term:
+                mask[self.rows[self.offsets[i]:self.offsets[i + 1]]] = True
+        return mask
+
+    def family_mask(self, family):
+        """Rows containing any ingredient of an allergen family (a superset of the plain-name match)"""
+        mask = np.zeros(len(self), dtype=bool)
+        for member in ALLERGEN_FAMILIES.get(family.lower(), []) + [family.lower()]:
+            member_mask = self.contains_mask(member)
+            if member_mask is not None:
+                mask |= member_mask
+        return mask
+
+    def positions(self, recipe_ids):
+        """Index rows of numeric recipe ids, and a mask of the ids the index knows"""
+        ids = np.asarray(recipe_ids, dtype=np.float64)
+        if len(self) == 0:
+            return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        positions = np.searchsorted(self.ids, np.nan_to_num(ids, nan=-1)).clip(0, len(self) - 1)
+        return positions, self.ids[positions] == ids
+
+    def lookup(self, needle, positions, known):
+        """(is_text, found) masks for rows at positions; None if the needle needs a scan"""
+        mask = self.contains_mask(needle)
+        if mask is None:
+            return None
+        return ~self.nulls[positions] & known, mask[positions] & known
+
+def macro_fractions(protein, carbs, fat):
+    """Calorie fractions (protein, carbs, fat) per recipe, NaN where there are no macro calories"""
+    protein = np.asarray(protein, dtype=np.float64) * 4
+    carbs = np.asarray(carbs, dtype=np.float64) * 4
+    fat = np.asarray(fat, dtype=np.float64) * 9
+    total = protein + carbs + fat
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fractions = np.stack([protein, carbs, fat], axis=1) / total[:, None]
+    fractions[~(total > 0)] = np.nan
+    return fractions
+
+class MacroIndex:
+    """Grid over protein/carbs calorie fractions for nearest-macro-ratio queries (fat is the remainder)"""
+    def __init__(self, fractions, offsets, rows):
+        self.fractions = fractions
+        self.offsets = offsets
+        self.rows = rows
+
+    @classmethod
+    def build(cls, protein, carbs, fat):
+        """Bucket each recipe row by its protein and carbs fractions"""
+        fractions = macro_fractions(protein, carbs, fat).astype(np.float32)
+        rows = np.flatnonzero(np.isfinite(fractions).all(axis=1))
+        cells = cls.cell_of(fractions[rows, 0], fractions[rows, 1])
+        order = np.argsort(cells, kind="stable")
+        offsets = np.zeros(MACRO_GRID_CELLS * MACRO_GRID_CELLS + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(cells, minlength=MACRO_GRID_CELLS * MACRO_GRID_CELLS))
+        return cls(fractions, offsets, rows[order].astype(np.int32))
+
+    @staticmethod
+    def cell_of(protein_fraction, carbs_fraction):
+        x = np.clip((np.asarray(protein_fraction) * MACRO_GRID_CELLS).astype(np.int64), 0, MACRO_GRID_CELLS - 1)
+        y = np.clip((np.asarray(carbs_fraction) * MACRO_GRID_CELLS).astype(np.int64), 0, MACRO_GRID_CELLS - 1)
+        return x * MACRO_GRID_CELLS + y
+
+    def __len__(self):
+        return len(self.fractions)
+
+    def ring(self, x, y, radius):
+        """Rows in the cells exactly radius cells away (Chebyshev) from cell (x, y)"""
+        if radius == 0:
+            cells = [(x, y)]
+        else:
+            cells = [(i, y - radius) for i in range(x - radius, x + radius + 1)]
+            cells += [(i, y + radius) for i in range(x - radius, x + radius + 1)]
+            cells += [(x - radius, j) for j in range(y - radius + 1, y + radius)]
+            cells += [(x + radius, j) for j in range(y - radius + 1, y + radius)]
+        slices = [
+            self.rows[self.offsets[i * MACRO_GRID_CELLS + j]:self.offsets[i * MACRO_GRID_CELLS + j + 1]]
+            for i, j in cells if 0 <= i < MACRO_GRID_CELLS and 0 <= j < MACRO_GRID_CELLS
+        ]
+        return np.concatenate(slices) if slices else np.zeros(0, dtype=np.int32)
+
+    def nearest(self, target, k=10, mask=None):
+        """Rows nearest a {"protein", "carbs", "fat"} ratio among rows allowed by mask, and their distances"""
+        point = np.array([target.get("protein", 0), target.get("carbs", 0), target.get("fat", 0)], dtype=np.float64)
+        # Recipe fractions sum to 1; goal ratios need not, so search around the target's projection onto that plane
+        offset = (1 - point.sum()) / 3
+        projected = point + offset
+        height = abs(offset) * np.sqrt(3)
+        x, y = divmod(int(self.cell_of(projected[0], projected[1])), MACRO_GRID_CELLS)
+        width = 1.0 / MACRO_GRID_CELLS
+        # Distance from the projection to the nearest edge of its own cell
+        edge = max(0.0, min(
+            projected[0] - x * width, (x + 1) * width - projected[0],
+            projected[1] - y * width, (y + 1) * width - projected[1]
+        ))
+
+        found_rows, found_distances = [], []
+        kth = np.inf
+        for radius in range(MACRO_GRID_CELLS):
+            rows = self.ring(x, y, radius)
+            if mask is not None:
+                rows = rows[mask[rows]]
+            if len(rows):
+                found_rows.append(rows)
+                found_distances.append(np.sqrt(((self.fractions[rows] - point) ** 2).sum(axis=1)))
+                distances = np.concatenate(found_distances)
+                if len(distances) >= k:
+                    kth = np.partition(distances, k - 1)[k - 1]
+            # Anything further out differs from the projection by more than radius * width + edge in protein or carbs
+            if kth <= np.hypot(radius * width + edge, height):
+                break
+
+        if not found_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        rows = np.concatenate(found_rows)
+        distances = np.concatenate(found_distances)
+        order = np.lexsort((rows, distances))[:k]
+        return rows[order].astype(np.int64), distances[order]
+
+class RecipeStore:
+    """Columnar, read-only recipe catalog: float32 nutrients, small-int categoricals and tag bitmasks"""
+    def __init__(self, ids, numeric, codes, vocabularies, tag_vocabulary, tag_bits, strings, source_version=None, allergen_index=None, macro_index=None):
+        self.ids = ids
+        self.numeric = numeric
+        self.codes = codes
+        self.vocabularies = vocabularies
+        self.tag_vocabulary = tag_vocabulary
+        self.tag_bits = tag_bits
+        self.strings = strings
+        self.source_version = source_version
+        self.allergen_index = allergen_index
+        self.macro_index = macro_index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, name):
+        """Get a column as an array (numeric/id) or list of strings (text/categorical)"""
+        if name == "id":
+            return self.ids
+        if name in self.numeric:
+            return self.numeric[name]
+        if name in self.codes:
+            vocabulary = self.vocabularies[name]
+            return [vocabulary[code] for code in self.codes[name]]
+        return [self.strings[name][i] for i in range(len(self))]
+
+    def tag_mask(self, tags):
+        """Boolean mask of recipes carrying any of the given tags"""
+        mask = np.zeros(len(self), dtype=bool)
+        for tag in tags:
+            if tag in self.tag_vocabulary:
+                bit = self.tag_vocabulary.index(tag)
+                word, offset = divmod(bit, 64)
+                mask |= (self.tag_bits[:, word] >> np.uint64(offset)) & np.uint64(1) == 1
+        return mask
+
+    def categorical_mask(self, name, substring):
+        """Boolean mask of recipes whose categorical value contains substring (case-insensitive)"""
+        matching = [code for code, value in enumerate(self.vocabularies[name])
+                    if substring.lower() in (value or "").lower()]
+        return np.isin(self.codes[name], matching)
+
+    def select(self, limit=None, diet_type=None, meal_type=None, cooking_status=None, min_calories=None, max_calories=None):
+        """Row indices matching the get_recipes filters, in id order"""
+        mask = np.ones(len(self), dtype=bool)
+        if diet_type:
+            # Tags hold both the diet tag and category items, matched like the SQL LIKE filter
+            needle = diet_type.lower()
+            mask &= self.tag_mask([tag for tag in self.tag_vocabulary if needle in tag.lower()])
+        if meal_type:
+            mask &= self.categorical_mask("meal_type", meal_type)
+        if cooking_status:
+            vocabulary = self.vocabularies["cooking_status"]
+            code = vocabulary.index(cooking_status) if cooking_status in vocabulary else -1
+            mask &= self.codes["cooking_status"] == code
+        if min_calories is not None:
+            mask &= self.numeric["calories"] >= min_calories
+        if max_calories is not None:
+            mask &= self.numeric["calories"] <= max_calories
+
+        indices = np.flatnonzero(mask)
+        return indices[:limit] if limit is not None else indices
+
+    def closest_macros(self, target, k=10, indices=None):
+        """Row indices of the k recipes nearest a macro ratio, optionally among the given rows, closest first"""
+        mask = None
+        if indices is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[indices] = True
+        return self.macro_index.nearest(target, k, mask)[0]
+
+    def to_records(self, indices=None):
+        """Materialize rows as dicts shaped like get_recipes rows"""
+        if indices is None:
+            indices = range(len(self))
+        records = []
+        for i in indices:
+            record = {"id": int(self.ids[i])}
+            for name in NUMERIC_COLUMNS:
+                # Rounding drops float32 noise (12.3 rather than 12.300000190734863)
+                record[name] = round(float(self.numeric[name][i]), 3)
+            record["calories"] = int(round(record["calories"]))
+            for name in CATEGORICAL_COLUMNS:
+                record[name] = self.vocabularies[name][self.codes[name][i]]
+            for name in STRING_COLUMNS:
+                record[name] = self.strings[name][i]
+            records.append(record)
+        return records
+
+    def to_dataframe(self, indices=None):
+        """Materialize rows as a get_recipes-shaped DataFrame"""
+        return pd.DataFrame(self.to_records(indices), columns=RECORD_COLUMNS)
+
+def split_tags(value):
+    """Split a comma-joined tag string into stripped, non-empty items"""
+    if not isinstance(value, str):
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def build_recipe_store(chunk_size=5000):
+    """Build a columnar store from every recipe in the database"""
+    # Read the version and the rows in one transaction, so the store never claims a newer catalog than its rows
+    with database.read_transaction() as conn:
+        source_version = database.get_database_version(conn)
+        rows = [row for chunk in database.iter_recipes(chunk_size=chunk_size, as_records=True, conn=conn) for row in chunk]
+
+    ids = np.array([row["id"] for row in rows], dtype=np.int64)
+    numeric = {
+        name: np.array([row[name] or 0 for row in rows], dtype=np.float32)
+        for name in NUMERIC_COLUMNS
+    }
+
+    codes = {}
+    vocabularies = {}
+    for name in CATEGORICAL_COLUMNS:
+        vocabulary = sorted({row[name] or "" for row in rows})
+        lookup = {value: code for code, value in enumerate(vocabulary)}
+        vocabularies[name] = vocabulary
+        codes[name] = np.array([lookup[row[name] or ""] for row in rows], dtype=np.uint8 if len(vocabulary) < 256 else np.uint16)
+
+    row_tags = [set(split_tags(row["diet_tags"])) | set(split_tags(row["category"])) for row in rows]
+    tag_vocabulary = sorted(set().union(*row_tags)) if row_tags else []
+    tag_bits = np.zeros((len(rows), max(1, -(-len(tag_vocabulary) // 64))), dtype=np.uint64)
+    bit_of = {tag: bit for bit, tag in enumerate(tag_vocabulary)}
+    for i, tags in enumerate(row_tags):
+        for tag in tags:
+            word, offset = divmod(bit_of[tag], 64)
+            tag_bits[i, word] |= np.uint64(1) << np.uint64(offset)
+
+    strings = {name: StringColumn.from_values([row[name] for row in rows]) for name in STRING_COLUMNS}
+    allergen_index = AllergenIndex.build(ids, [row["ingredients"] for row in rows], source_version)
+    macro_index = MacroIndex.build(numeric["protein"], numeric["carbs"], numeric["fat"])
+    return RecipeStore(ids, numeric, codes, vocabularies, tag_vocabulary, tag_bits, strings, source_version, allergen_index, macro_index)
+
+def save_snapshot(store, directory=SNAPSHOT_DIR):
+    """Write the store as .npy files, replacing any previous snapshot atomically"""
+    staging = directory + ".tmp"
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+
+    np.save(os.path.join(staging, "ids.npy"), store.ids)
+    np.save(os.path.join(staging, "tag_bits.npy"), store.tag_bits)
+    for name, values in store.numeric.items():
+        np.save(os.path.join(staging, f"{name}.npy"), values)
+    for name, values in store.codes.items():
+        np.save(os.path.join(staging, f"{name}.codes.npy"), values)
+    for name, column in store.strings.items():
+        np.save(os.path.join(staging, f"{name}.offsets.npy"), column.offsets)
+        np.save(os.path.join(staging, f"{name}.data.npy"), column.data)
+        np.save(os.path.join(staging, f"{name}.nulls.npy"), column.nulls)
+    if store.allergen_index is not None:
+        index = store.allergen_index
+        np.save(os.path.join(staging, "allergen_terms.offsets.npy"), index.terms.offsets)
+        np.save(os.path.join(staging, "allergen_terms.data.npy"), index.terms.data)
+        np.save(os.path.join(staging, "allergen_terms.nulls.npy"), index.terms.nulls)
+        np.save(os.path.join(staging, "allergen_offsets.npy"), index.offsets)
+        np.save(os.path.join(staging, "allergen_rows.npy"), index.rows)
+    if store.macro_index is not None:
+        np.save(os.path.join(staging, "macro_fractions.npy"), store.macro_index.fractions)
+        np.save(os.path.join(staging, "macro_offsets.npy"), store.macro_index.offsets)
+        np.save(os.path.join(staging, "macro_rows.npy"), store.macro_index.rows)
+
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "count": len(store),
+            "vocabularies": store.vocabularies,
+            "tag_vocabulary": store.tag_vocabulary,
+            "source_version": list(store.source_version) if store.source_version else None
+        }, f)
+
+    # Swap directories; open memory maps of the old snapshot stay valid until released
+    retired = directory + ".old"
+    if os.path.exists(retired):
+        shutil.rmtree(retired)
+    if os.path.exists(directory):
+        os.rename(directory, retired)
+    os.rename(staging, directory)
+    if os.path.exists(retired):
+        shutil.rmtree(retired, ignore_errors=True)
+
+def load_snapshot(directory=SNAPSHOT_DIR):
+    """Memory-map a saved snapshot; returns None if there isn't one"""
+    meta_path = os.path.join(directory, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    def load(filename):
+        return np.load(os.path.join(directory, filename), mmap_mode="r")
+
+    ids = load("ids.npy")
+    strings = {
+        name: StringColumn(load(f"{name}.offsets.npy"), load(f"{name}.data.npy"), load(f"{name}.nulls.npy"))
+        for name in STRING_COLUMNS
+    }
+    allergen_index = None
+    if os.path.exists(os.path.join(directory, "allergen_rows.npy")):
+        allergen_index = AllergenIndex(
+            ids,
+            StringColumn(load("allergen_terms.offsets.npy"), load("allergen_terms.data.npy"), load("allergen_terms.nulls.npy")),
+            load("allergen_offsets.npy"),
+            load("allergen_rows.npy"),
+            strings["ingredients"].nulls,
+            tuple(meta["source_version"]) if meta["source_version"] else None
+        )
+    macro_index = None
+    if os.path.exists(os.path.join(directory, "macro_rows.npy")):
+        macro_index = MacroIndex(load("macro_fractions.npy"), load("macro_offsets.npy"), load("macro_rows.npy"))
+
+    return RecipeStore(
+        ids=ids,
+        numeric={name: load(f"{name}.npy") for name in NUMERIC_COLUMNS},
+        codes={name: load(f"{name}.codes.npy") for name in CATEGORICAL_COLUMNS},
+        vocabularies=meta["vocabularies"],
+        tag_vocabulary=meta["tag_vocabulary"],
+        tag_bits=load("tag_bits.npy"),
+        strings=strings,
+        source_version=tuple(meta["source_version"]) if meta["source_version"] else None,
+        allergen_index=allergen_index,
+        macro_index=macro_index
+    )
+
+def load_or_build_snapshot(directory=SNAPSHOT_DIR):
+    """Load the snapshot, rebuilding it first if the database has changed since it was written"""
+    store = load_snapshot(directory)
+    # Snapshots written before an index existed are rebuilt too
+    current = store is not None and store.allergen_index is not None and store.macro_index is not None
+    if current and store.source_version == database.get_database_version():
+        return store
+
+    save_snapshot(build_recipe_store(), directory)
+    return load_snapshot(directory)
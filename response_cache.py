@@ -0,0 +1,182 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# zstd compresses API pages better and faster, but is optional
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_TTL = 7 * 24 * 3600  # Seconds before a cached response goes stale
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # Compressed payload budget
+EVICT_TO_FRACTION = 0.9  # Evict down to this fraction of the budget
+
+def make_cache_key(**params):
+    """Hash every request parameter into a stable cache key"""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def compress_payload(data):
+    """Serialize and compress a response, returning (codec, blob)"""
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=6).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=6)
+
+def decompress_payload(codec, blob):
+    """Inverse of compress_payload"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is required to read zstd cache entries")
+        raw = zstandard.ZstdDecompressor().decompress(blob)
+    elif codec == "gzip":
+        raw = gzip.decompress(blob)
+    else:
+        raw = blob
+    return json.loads(raw)
+
+class ResponseCache:
+    """Single-file API response cache with TTL, LRU eviction under a byte budget and hit statistics"""
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            codec TEXT,
+            payload BLOB,
+            size INTEGER,
+            created_at REAL,
+            accessed_at REAL
+        )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self.conn.commit()
+
+    def get(self, key):
+        """Return the cached response for key, or None if missing or expired"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT codec, payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            codec, payload, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            with self.conn:
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return decompress_payload(codec, payload)
+
+    def put(self, key, data, created_at=None):
+        """Store a response and evict least recently used entries over the byte budget"""
+        codec, payload = compress_payload(data)
+        self.put_compressed(key, codec, payload, created_at)
+
+    def put_compressed(self, key, codec, payload, created_at=None):
+        """Store an already compressed JSON response"""
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                self.conn.execute('''
+                INSERT OR REPLACE INTO responses (key, codec, payload, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (key, codec, payload, len(payload), created_at or now, now))
+            self.writes += 1
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock
+        if self.max_bytes is None:
+            return
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICT_TO_FRACTION
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def iter_payloads(self, batch_size=64):
+        """Yield (codec, payload) for every entry, including expired ones"""
+        # A separate connection keeps long scans from holding the lock
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute("SELECT codec, payload FROM responses")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def purge_expired(self):
+        """Delete every entry older than the TTL"""
+        if self.ttl is None:
+            return 0
+        with self.lock:
+            with self.conn:
+                cursor = self.conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+                )
+            self.expired += cursor.rowcount
+            return cursor.rowcount
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self.lock:
+            entries, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "writes": self.writes,
+            "entries": entries,
+            "bytes": total
+        }
+
+    def close(self):
+        """Close the underlying database"""
+        with self.lock:
+            self.conn.close()
@@ -1,6 +1,194 @@
+import hashlib
+import json
+import numbers
+import threading
+import time
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
 
+from lru_cache import LRUCache
+
+RULE_PLAN_CACHE_SIZE = 256  # Compiled plans and eligible-recipe results kept per process
+FILTER_BATCH_CELLS = 1 << 25  # Profiles x recipes matrix cells evaluated per block by filter_recipes_batch
+RULE_PROFILING = False  # Opt-in (benchmarks, debugging): record per-rule timings and pass rates, and order rules within a tier by them
+RULE_PROFILE_SIZE = 512  # Rules the profiler keeps statistics for; the least recently seen are dropped
+RULE_SUBSET_FRACTION = 0.5  # Evaluate a tier's remaining rules on the surviving rows once fewer than this fraction remain
+
+def get_value(obj, key, default=None):
+    """Safely get a value from either a dict or a pandas Series"""
+    if hasattr(obj, 'get') and callable(obj.get):  # Dictionary-like
+        return obj.get(key, default)
+    elif hasattr(obj, key):  # Pandas Series attribute
+        val = getattr(obj, key)
+        return val if not pd.isna(val) else default
+    elif isinstance(obj, dict) and key in obj:  # Dictionary
+        return obj[key]
+    elif hasattr(obj, '__getitem__') and key in obj:  # Series with string index
+        val = obj[key]
+        return val if not pd.isna(val) else default
+    else:
+        return default
+
+def to_float(value):
+    """float(value), or None where float() would raise"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+class RecipeColumns:
+    """Column view over a DataFrame or list of recipe dicts, seeing the same values FoodRule.apply does"""
+    def __init__(self, recipes, allergen_index=None, rows=None, catalog_version=None):
+        self.frame = recipes if isinstance(recipes, pd.DataFrame) else None
+        self.records = None if self.frame is not None else list(recipes)
+        self.rows = rows  # Positions of the viewed recipes, or None for all of them
+        self.cache = {}
+        # Allergy exclusion is a safety filter: only trust the index when the caller's recipes were read
+        # at the catalog version it was built from, otherwise a re-ingested id could answer from old ingredients
+        indexable = (
+            self.frame is not None and {"id", "ingredients"} <= set(self.frame.columns)
+            and allergen_index is not None and catalog_version is not None
+            and allergen_index.source_version == catalog_version
+        )
+        self.allergen_index = allergen_index if indexable else None
+
+    def __len__(self):
+        if self.rows is not None:
+            return len(self.rows)
+        return len(self.frame) if self.frame is not None else len(self.records)
+
+    def column(self, key):
+        """The frame column for key, limited to the viewed rows"""
+        column = self.frame[key]
+        return column if self.rows is None else column.take(self.rows)
+
+    def values(self, key, default):
+        """Object array of each recipe's value, or default where the key is missing"""
+        cache_key = ("values", key, default)
+        if cache_key not in self.cache:
+            if self.frame is not None:
+                if key in self.frame.columns:
+                    values = self.column(key).to_numpy(dtype=object)
+                else:
+                    values = np.full(len(self), default, dtype=object)
+            else:
+                records = self.records if self.rows is None else (self.records[i] for i in self.rows)
+                values = np.fromiter((get_value(recipe, key, default) for recipe in records), dtype=object, count=len(self))
+            self.cache[cache_key] = values
+        return self.cache[cache_key]
+
+    def lowered(self, key, default):
+        """Distinct lowercased texts (None for non-text) and each recipe's index into them"""
+        cache_key = ("lowered", key, default)
+        if cache_key not in self.cache:
+            values = self.values(key, default)
+            try:
+                # Tags, categories and shared ingredient lists repeat a lot; lowercase each distinct value once
+                codes, uniques = pd.factorize(values)
+            except TypeError:  # Unhashable values
+                codes, uniques = np.arange(len(values)), values
+            lowered = [value.lower() if isinstance(value, str) else None for value in uniques]
+            # Missing values get code -1, which picks the trailing non-text entry
+            self.cache[cache_key] = (lowered + [None], codes)
+        return self.cache[cache_key]
+
+    def contains(self, key, default, needle):
+        """Masks of recipes whose value is text, and whose lowercased text contains needle"""
+        if key == "ingredients" and self.allergen_index is not None:
+            if "positions" not in self.cache:
+                self.cache["positions"] = self.allergen_index.positions(self.numbers("id", None)[0])
+            positions, known = self.cache["positions"]
+            looked_up = self.allergen_index.lookup(needle, positions, known)
+            if looked_up is not None:
+                is_text, found = looked_up
+                # Recipes the index has never seen are scanned
+                unknown = np.flatnonzero(~known)
+                for i, value in zip(unknown, self.values(key, default)[unknown] if len(unknown) else []):
+                    is_text[i] = isinstance(value, str)
+                    found[i] = is_text[i] and needle in value.lower()
+                return is_text, found
+        
+        lowered, codes = self.lowered(key, default)
+        is_text = np.array([value is not None for value in lowered], dtype=bool)
+        found = np.array([value is not None and needle in value for value in lowered], dtype=bool)
+        return is_text[codes], found[codes]
+
+    def numbers(self, key, default):
+        """float64 values as float() sees them, plus a mask of values float() accepts"""
+        cache_key = ("numbers", key, default)
+        if cache_key not in self.cache:
+            column = self.column(key) if self.frame is not None and key in self.frame.columns else None
+            if column is not None and isinstance(column.dtype, np.dtype) and column.dtype.kind in "biuf":
+                result = (column.to_numpy(dtype=np.float64), np.ones(len(self), dtype=bool))
+            else:
+                converted = [to_float(value) for value in self.values(key, default)]
+                result = (
+                    np.array([np.nan if value is None else value for value in converted], dtype=np.float64),
+                    np.array([value is not None for value in converted], dtype=bool)
+                )
+            self.cache[cache_key] = result
+        return self.cache[cache_key]
+
+    def frame_rows(self, indices=None):
+        """Column names and native-value row tuples of the frame (all rows when indices is None)"""
+        frame = self.frame if indices is None else self.frame.iloc[indices]
+        # iterrows upcasts all-numeric rows to one dtype; keep the same values
+        dtypes = set(frame.dtypes)
+        if len(dtypes) > 1 and all(isinstance(dtype, np.dtype) and dtype.kind in "iuf" for dtype in dtypes):
+            frame = frame.astype(np.result_type(*dtypes))
+        # Column lists zipped into tuples give the same native values as to_dict("records"), faster
+        keys = list(frame.columns)
+        rows = list(zip(*[frame[key].tolist() for key in keys])) if keys else [() for _ in range(len(frame))]
+        return keys, rows
+
+    def cache_rows(self):
+        """Convert every frame row once, so repeated to_records calls only build dicts"""
+        if self.frame is not None and "rows" not in self.cache:
+            self.cache["rows"] = self.frame_rows()
+
+    def subset(self, indices):
+        """View of the recipes at indices, reusing every per-recipe array already computed"""
+        view = RecipeColumns.__new__(RecipeColumns)
+        view.frame, view.records, view.allergen_index = self.frame, self.records, self.allergen_index
+        view.rows = indices if self.rows is None else self.rows[indices]
+        view.cache = {}
+        for cache_key, cached in self.cache.items():
+            if cache_key == "rows":  # Whole-frame rows, addressed by absolute position
+                view.cache[cache_key] = cached
+            elif cache_key == "positions" or cache_key[0] == "numbers":
+                view.cache[cache_key] = (cached[0][indices], cached[1][indices])
+            elif cache_key[0] == "lowered":
+                view.cache[cache_key] = (cached[0], cached[1][indices])
+            elif cache_key[0] == "values":
+                view.cache[cache_key] = cached[indices]
+        return view
+
+    def to_records(self, indices, scores):
+        """Recipes at indices as dicts carrying their expert_score"""
+        if self.rows is not None:
+            indices = self.rows[indices]
+        if self.frame is not None:
+            if "rows" in self.cache:
+                keys, rows = self.cache["rows"]
+                records = [dict(zip(keys, rows[i])) for i in indices]
+            else:
+                keys, rows = self.frame_rows(indices)
+                records = [dict(zip(keys, row)) for row in rows]
+        else:
+            records = [
+                recipe.copy() if hasattr(recipe, 'copy') else recipe
+                for recipe in (self.records[i] for i in indices)
+            ]
+
+        for recipe, score in zip(records, scores):
+            if isinstance(recipe, dict):
+                recipe['expert_score'] = int(score)
+            else:
+                recipe.expert_score = int(score)
+        return records
+
 class FoodRule:
     def __init__(self, rule_type, condition, priority=1):
         self.rule_type = rule_type
@@ -9,21 +197,6 @@ class FoodRule:
 
     def apply(self, recipe):
         """Apply rule to a recipe (works with both dict and pandas Series)"""
-        # Helper function to safely get a value from either dict or pandas Series
-        def get_value(obj, key, default=None):
-            if hasattr(obj, 'get') and callable(obj.get):  # Dictionary-like
-                return obj.get(key, default)
-            elif hasattr(obj, key):  # Pandas Series attribute
-                val = getattr(obj, key)
-                return val if not pd.isna(val) else default
-            elif isinstance(obj, dict) and key in obj:  # Dictionary
-                return obj[key]
-            elif hasattr(obj, '__getitem__') and key in obj:  # Series with string index
-                val = obj[key]
-                return val if not pd.isna(val) else default
-            else:
-                return default
-        
         # Check rule type and apply appropriate condition
         if self.rule_type == "exclude_ingredient":
             ingredients = get_value(recipe, "ingredients", "")
@@ -105,6 +278,228 @@ class FoodRule:
                 
         return True  # Default: rule passes if not recognized
 
+    def mask(self, columns):
+        """Vectorized apply: boolean array of the recipes in a RecipeColumns that pass this rule"""
+        size = len(columns)
+        
+        if self.rule_type == "exclude_ingredient":
+            is_text, found = columns.contains("ingredients", "", self.condition.lower())
+            return ~(is_text & found)
+            
+        elif self.rule_type == "require_diet":
+            # Non-text values never match, so either column may satisfy the rule
+            needle = self.condition.lower()
+            _, in_tags = columns.contains("diet_tags", "", needle)
+            _, in_category = columns.contains("category", "", needle)
+            return in_tags | in_category
+            
+        elif self.rule_type in ("max_calories", "min_protein"):
+            limit = to_float(self.condition)
+            if limit is None:
+                return np.zeros(size, dtype=bool)
+            # Unconvertible values are NaN, which fails every comparison just as apply's except branch does
+            if self.rule_type == "max_calories":
+                return columns.numbers("calories", 0)[0] <= limit
+            return columns.numbers("protein", 0)[0] >= limit
+            
+        elif self.rule_type == "cooking_preference":
+            cooking_status = columns.values("cooking_status", "")
+            if self.condition == "cooked":
+                return cooking_status == "cooked"
+            elif self.condition == "no-cook":
+                return cooking_status == "uncooked"
+            return np.ones(size, dtype=bool)
+            
+        elif self.rule_type == "calorie_range":
+            try:
+                min_cal, max_cal = self.condition
+                min_cal, max_cal = float(min_cal), float(max_cal)
+            except (ValueError, TypeError):
+                return np.zeros(size, dtype=bool)
+            calories = columns.numbers("calories", 0)[0]
+            return (min_cal <= calories) & (calories <= max_cal)
+            
+        elif self.rule_type == "macro_ratio":
+            protein, protein_ok = columns.numbers("protein", 0)
+            carbs, carbs_ok = columns.numbers("carbs", 0)
+            fat, fat_ok = columns.numbers("fat", 0)
+            
+            # Same operation order as apply, so every float rounds identically
+            total_calories = protein * 4 + carbs * 4 + fat * 9
+            passed = protein_ok & carbs_ok & fat_ok & (total_calories != 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                actual_ratio = {
+                    "protein": (protein * 4) / total_calories,
+                    "carbs": (carbs * 4) / total_calories,
+                    "fat": (fat * 9) / total_calories
+                }
+                for macro, target in self.condition.items():
+                    if not isinstance(target, numbers.Real):
+                        return np.zeros(size, dtype=bool)
+                    actual = actual_ratio.get(macro, 0)
+                    # NaN ratios pass, as abs(nan - target) > 0.1 is False in apply too
+                    passed &= ~(np.abs(actual - target) > 0.1)
+            return passed
+            
+        return np.ones(size, dtype=bool)  # Default: rule passes if not recognized
+
+class RuleProfiler:
+    """Per-rule evaluation time, pass rate and short-circuit counts, keyed by rule_key"""
+    def __init__(self, maxsize=RULE_PROFILE_SIZE):
+        self.lock = threading.Lock()
+        self.rules = OrderedDict()
+        self.maxsize = maxsize
+
+    def _entry(self, rule):
+        # Caller holds the lock
+        key = rule_key(rule)
+        if key not in self.rules:
+            # Calorie targets are part of the key, so bound the table like an LRU cache
+            self.rules[key] = {
+                "rule_type": rule.rule_type, "condition": key[1], "evaluations": 0, "seconds": 0.0,
+                "recipes": 0, "passed": 0, "subset_recipes": 0, "subset_passed": 0, "short_circuits": 0
+            }
+            while len(self.rules) > self.maxsize:
+                self.rules.popitem(last=False)
+        self.rules.move_to_end(key)
+        return self.rules[key]
+
+    def mask(self, rule, columns):
+        """rule.mask(columns), recording its time and pass count"""
+        start = time.perf_counter()
+        mask = rule.mask(columns)
+        seconds = time.perf_counter() - start
+        passed = int(np.count_nonzero(mask))
+        # On a subset view the recipes already passed earlier rules, so that pass rate is conditional
+        subset = "subset_" if columns.rows is not None else ""
+        with self.lock:
+            entry = self._entry(rule)
+            entry["evaluations"] += 1
+            entry["seconds"] += seconds
+            entry[subset + "recipes"] += len(mask)
+            entry[subset + "passed"] += passed
+        return mask
+
+    def short_circuited(self, rules):
+        """Count rules skipped because no recipe was left to reject"""
+        with self.lock:
+            for rule in rules:
+                self._entry(rule)["short_circuits"] += 1
+
+    def order(self, rules):
+        """Rules of one tier, cheapest per rejected recipe first; rules without statistics run first"""
+        # Ordering an AND of masks never changes the result, only how soon it can stop
+        with self.lock:
+            ranks = []
+            for rule in rules:
+                entry = self.rules.get(rule_key(rule))
+                if entry is None or not entry["evaluations"]:
+                    ranks.append(0.0)
+                    continue
+                # Prefer the unconditional pass rate; fall back to the one seen after earlier rules
+                recipes, passed = entry["recipes"], entry["passed"]
+                if not recipes:
+                    recipes, passed = entry["subset_recipes"], entry["subset_passed"]
+                rejected = 1 - passed / recipes if recipes else 0.0
+                mean_seconds = entry["seconds"] / entry["evaluations"]
+                ranks.append(mean_seconds / rejected if rejected > 0 else float("inf"))
+        return [rule for _, rule in sorted(zip(ranks, rules), key=lambda item: item[0])]
+
+    def report(self):
+        """Per-rule statistics, most total time first; conditional_pass_rate only counts rows that passed earlier rules"""
+        with self.lock:
+            entries = [dict(entry) for entry in self.rules.values()]
+        report = []
+        for entry in entries:
+            evaluations = entry["evaluations"]
+            report.append({
+                "rule_type": entry["rule_type"],
+                "condition": entry["condition"],
+                "evaluations": evaluations,
+                "total_ms": entry["seconds"] * 1000,
+                "mean_ms": entry["seconds"] * 1000 / evaluations if evaluations else 0.0,
+                "pass_rate": entry["passed"] / entry["recipes"] if entry["recipes"] else None,
+                "conditional_pass_rate": entry["subset_passed"] / entry["subset_recipes"] if entry["subset_recipes"] else None,
+                "short_circuits": entry["short_circuits"]
+            })
+        report.sort(key=lambda item: item["total_ms"], reverse=True)
+        return report
+
+    def reset(self):
+        """Drop every recorded statistic"""
+        with self.lock:
+            self.rules.clear()
+
+_rule_profiler = RuleProfiler()
+
+def rule_mask(rule, columns):
+    """rule.mask(columns), through the rule profiler when RULE_PROFILING is on"""
+    if RULE_PROFILING:
+        return _rule_profiler.mask(rule, columns)
+    return rule.mask(columns)
+
+def rule_profile_report():
+    """Structured per-rule statistics from the shared profiler"""
+    return _rule_profiler.report()
+
+def reset_rule_profile():
+    """Clear the shared profiler's statistics"""
+    _rule_profiler.reset()
+
+class RulePlan:
+    """FoodRules compiled into priority tiers evaluated as vectorized masks"""
+    def __init__(self, rules):
+        self.high_priority_rules = [rule for rule in rules if rule.priority >= 5]
+        self.medium_priority_rules = [rule for rule in rules if 2 < rule.priority < 5]
+        self.low_priority_rules = [rule for rule in rules if rule.priority <= 2]
+
+    def passing(self, rules, columns, mask=None):
+        """Mask of recipes passing every rule, starting from mask (all recipes by default)"""
+        kept = np.ones(len(columns), dtype=bool) if mask is None else mask.copy()
+        if RULE_PROFILING:
+            rules = _rule_profiler.order(rules)
+        
+        # Once few recipes survive, later rules only look at those, so selective rules first save work
+        rows, view = None, columns
+        for position, rule in enumerate(rules):
+            if np.count_nonzero(kept) < RULE_SUBSET_FRACTION * len(kept):
+                indices = np.flatnonzero(kept)
+                rows, view = indices if rows is None else rows[indices], view.subset(indices)
+                kept = np.ones(len(rows), dtype=bool)
+            kept &= rule_mask(rule, view)
+            if not kept.any():
+                if RULE_PROFILING:
+                    _rule_profiler.short_circuited(rules[position + 1:])
+                break
+        
+        if rows is None:
+            return kept
+        mask = np.zeros(len(columns), dtype=bool)
+        mask[rows[kept]] = True
+        return mask
+
+    def evaluate(self, columns):
+        """Row indices in output order and their expert scores, as filter_recipes_with_rules ranks them"""
+        selected = np.flatnonzero(self.passing(self.high_priority_rules, columns))
+        
+        # If we have too few recipes after high-priority filtering, skip medium priority
+        if len(selected) < 5:
+            print(f"Warning: Only {len(selected)} recipes match high-priority criteria. Relaxing constraints.")
+        else:
+            within = np.zeros(len(columns), dtype=bool)
+            within[selected] = True
+            medium = np.flatnonzero(self.passing(self.medium_priority_rules, columns, within))
+            # If we have enough recipes after medium-priority filtering, use those
+            if len(medium) >= 3:
+                selected = medium
+        
+        # Low-priority rules only score; a stable sort keeps ties in catalog order
+        scores = np.zeros(len(selected), dtype=np.int64)
+        for rule in self.low_priority_rules:
+            scores += rule_mask(rule, columns)[selected]
+        order = np.argsort(-scores, kind="stable")
+        return selected[order], scores[order]
+
 # Expert system rules for calorie distribution
 def get_calorie_distribution_rules(total_calories):
     """Get calorie distribution rules based on total daily calories"""
@@ -160,6 +555,11 @@ def get_macro_distribution_rules(goal):
             "fat": {"min": 0.25, "max": 0.35}
         }
 
+def goal_macro_target(goal):
+    """Target calorie fractions for a goal: the middle of each get_macro_distribution_rules range"""
+    macro_rules = get_macro_distribution_rules(goal)
+    return {macro: (bounds["min"] + bounds["max"]) / 2 for macro, bounds in macro_rules.items()}
+
 def create_rules_from_preferences(preferences):
     """Create food rules based on user preferences using expert system approach"""
     rules = []
@@ -187,21 +587,21 @@ def create_rules_from_preferences(preferences):
     
     # Macronutrient rules based on goal
     if preferences.get("goal"):
-        macro_rules = get_macro_distribution_rules(preferences["goal"])
-        target_ratio = {
-            "protein": (macro_rules["protein"]["min"] + macro_rules["protein"]["max"]) / 2,
-            "carbs": (macro_rules["carbs"]["min"] + macro_rules["carbs"]["max"]) / 2,
-            "fat": (macro_rules["fat"]["min"] + macro_rules["fat"]["max"]) / 2
-        }
-        rules.append(FoodRule("macro_ratio", target_ratio, priority=2))
+        rules.append(FoodRule("macro_ratio", goal_macro_target(preferences["goal"]), priority=2))
     
     # Sort rules by priority (highest first)
     rules.sort(key=lambda x: x.priority, reverse=True)
     
     return rules
 
-def filter_recipes_with_rules(recipes, rules):
+def filter_recipes_with_rules(recipes, rules, allergen_index=None, catalog_version=None):
     """Filter recipes based on rules with expert system approach"""
+    columns = RecipeColumns(recipes, allergen_index, catalog_version=catalog_version)
+    indices, scores = RulePlan(rules).evaluate(columns)
+    return columns.to_records(indices, scores)
+
+def filter_recipes_with_rules_rowwise(recipes, rules):
+    """Row-at-a-time reference implementation of filter_recipes_with_rules"""
     import pandas as pd
     
     # First apply high-priority rules (allergies, diet type)
@@ -294,7 +694,243 @@ def filter_recipes_with_rules(recipes, rules):
     
     return scored_recipes
 
-def filter_recipes(recipes, preferences):
+def filter_recipes(recipes, preferences, allergen_index=None, catalog_version=None):
     """Filter recipes based on user preferences"""
     rules = create_rules_from_preferences(preferences)
-    return filter_recipes_with_rules(recipes, rules)
+    return filter_recipes_with_rules(recipes, rules, allergen_index, catalog_version)
+
+def rule_key(rule):
+    """Hashable identity of a rule's type and condition, equal for rules that select the same recipes"""
+    return rule.rule_type, json.dumps(rule.condition, sort_keys=True, default=str)
+
+def evaluate_plans(plans, columns, masks=None):
+    """Profiles x recipes matrices of selected recipes and their low-priority scores, one row per RulePlan"""
+    # Each distinct rule is evaluated once into masks (rule_key -> mask) and shared by every plan using it
+    masks = {} if masks is None else masks
+    
+    def tier(rule_lists):
+        # Profiles with the same rules in a tier share one combined row
+        signatures = [tuple(sorted(rule_key(rule) for rule in rule_list)) for rule_list in rule_lists]
+        combined = {}
+        for signature, rule_list in zip(signatures, rule_lists):
+            if signature not in combined:
+                row = np.ones(len(columns), dtype=bool)
+                for rule in rule_list:
+                    key = rule_key(rule)
+                    if key not in masks:
+                        masks[key] = rule_mask(rule, columns)
+                    row &= masks[key]
+                combined[signature] = row
+        return np.stack([combined[signature] for signature in signatures]).reshape(len(rule_lists), len(columns))
+    
+    selected = tier([plan.high_priority_rules for plan in plans])
+    relaxed = selected.sum(axis=1) < 5
+    if relaxed.any():
+        print(f"Warning: {relaxed.sum()} profiles match fewer than 5 recipes on high-priority criteria. Relaxing constraints.")
+    
+    # Medium-priority rules apply only where enough recipes survive them, as in RulePlan.evaluate
+    medium = selected & tier([plan.medium_priority_rules for plan in plans])
+    use_medium = ~relaxed & (medium.sum(axis=1) >= 3)
+    selected[use_medium] = medium[use_medium]
+    
+    # Scores are a (profiles x low rules) count matrix times the (low rules x recipes) mask matrix
+    low_keys = {}
+    for plan in plans:
+        for rule in plan.low_priority_rules:
+            key = rule_key(rule)
+            if key not in low_keys:
+                if key not in masks:
+                    masks[key] = rule_mask(rule, columns)
+                low_keys[key] = len(low_keys)
+    counts = np.zeros((len(plans), len(low_keys)), dtype=np.float32)
+    for row, plan in enumerate(plans):
+        for rule in plan.low_priority_rules:
+            counts[row, low_keys[rule_key(rule)]] += 1
+    low_masks = np.zeros((len(low_keys), len(columns)), dtype=np.float32)
+    for key, row in low_keys.items():
+        low_masks[row] = masks[key]
+    scores = (counts @ low_masks).astype(np.int64)
+    return selected, scores
+
+def filter_recipes_batch(recipes, preferences_list, allergen_index=None, catalog_version=None):
+    """filter_recipes for many profiles at once, sharing rule masks; returns one result list per profile"""
+    columns = RecipeColumns(recipes, allergen_index, catalog_version=catalog_version)
+    masks = {}
+    
+    # Identical profiles are evaluated once
+    keys = [preferences_key(preferences) for preferences in preferences_list]
+    unique = {}
+    for key, preferences in zip(keys, preferences_list):
+        unique.setdefault(key, preferences)
+    unique_keys = list(unique)
+    
+    if len(unique) > 1:
+        columns.cache_rows()
+    
+    results = {}
+    block = max(1, FILTER_BATCH_CELLS // max(1, len(columns)))
+    for start in range(0, len(unique_keys), block):
+        block_keys = unique_keys[start:start + block]
+        plans = [RulePlan(create_rules_from_preferences(unique[key])) for key in block_keys]
+        selected, scores = evaluate_plans(plans, columns, masks)
+        for key, selected_row, score_row in zip(block_keys, selected, scores):
+            indices = np.flatnonzero(selected_row)
+            indices_scores = score_row[indices]
+            # A stable sort keeps ties in catalog order
+            order = np.argsort(-indices_scores, kind="stable")
+            results[key] = columns.to_records(indices[order], indices_scores[order])
+    
+    # Later duplicates get their own copies of the records
+    output = []
+    seen = set()
+    for key in keys:
+        output.append(results[key] if key not in seen else [recipe.copy() for recipe in results[key]])
+        seen.add(key)
+    return output
+
+def rule_to_sql(rule):
+    """WHERE clause and parameters that keep at least every recipe rule.apply passes, or None if it must run in Python"""
+    # SQLite's lower() only folds ASCII, so text clauses may keep a few extra rows; the Python pass drops them
+    if rule.rule_type == "exclude_ingredient":
+        return "(s.ingredients IS NULL OR instr(lower(s.ingredients), ?) = 0)", [rule.condition.lower()]
+    
+    elif rule.rule_type == "require_diet":
+        needle = rule.condition.lower()
+        if not needle.isascii():
+            return None
+        return "(instr(lower(s.diet_tags), ?) > 0 OR instr(lower(r.category), ?) > 0)", [needle, needle]
+    
+    elif rule.rule_type in ("max_calories", "min_protein"):
+        limit = to_float(rule.condition)
+        if limit is None:
+            return "0", []
+        if rule.rule_type == "max_calories":
+            return "r.calories <= ?", [limit]
+        return "r.protein >= ?", [limit]
+    
+    elif rule.rule_type == "cooking_preference":
+        if rule.condition == "cooked":
+            return "r.cooking_status = ?", ["cooked"]
+        elif rule.condition == "no-cook":
+            return "r.cooking_status = ?", ["uncooked"]
+        return "1", []
+    
+    elif rule.rule_type == "calorie_range":
+        try:
+            min_cal, max_cal = rule.condition
+            return "r.calories BETWEEN ? AND ?", [float(min_cal), float(max_cal)]
+        except (ValueError, TypeError):
+            return "0", []
+    
+    return None  # macro_ratio and unknown rules stay in Python
+
+def rules_to_sql(rules):
+    """Split rules into (where_clauses, params) for get_recipes and the rules left for Python"""
+    where_clauses, params, remaining = [], [], []
+    for rule in rules:
+        translated = rule_to_sql(rule)
+        if translated is None:
+            remaining.append(rule)
+        else:
+            where_clauses.append(translated[0])
+            params.extend(translated[1])
+    return where_clauses, params, remaining
+
+def query_recipes_with_rules(rules, query, limit=200, meal_type=None):
+    """Recipes from the whole catalog that the rule tiers can select, filtered by query in SQL before the Python pass"""
+    # query is get_recipes or a function with its signature, so the rules don't depend on the data layer
+    plan = RulePlan(rules)
+    strict = rules_to_sql(plan.high_priority_rules)
+    strict_and_medium = rules_to_sql(plan.high_priority_rules + plan.medium_priority_rules)
+    
+    # SQL can keep rows the rules reject (ASCII-only lower(), rules left in Python), so count tiers exactly here
+    recipes = query(limit, meal_type=meal_type, filters=strict_and_medium[:2])
+    medium_count = np.count_nonzero(
+        plan.passing(plan.high_priority_rules + plan.medium_priority_rules, RecipeColumns(recipes))
+    )
+    if medium_count >= 5:
+        # These rows alone hold 5+ high-priority matches, so the medium tier holds here too
+        return recipes
+    
+    # Whichever tier wins over the catalog, it wins the same way over both tiers' rows together
+    high = query(limit, meal_type=meal_type, filters=strict[:2])
+    frames = [frame for frame in (recipes, high) if not frame.empty]
+    if len(frames) < 2:
+        return frames[0] if frames else high
+    combined = pd.concat(frames, ignore_index=True).drop_duplicates("id")
+    return combined.sort_values("id", kind="stable").reset_index(drop=True)
+
+def preferences_key(preferences):
+    """Canonical hash of the preference fields that shape the rules"""
+    goal = preferences.get("goal")
+    diet_type = preferences["diet_type"]
+    canonical = {
+        # The diet rule matches lowercased, and "No restrictions" adds no rule at all
+        "diet_type": None if diet_type == "No restrictions" else diet_type.lower(),
+        # Allergy rules are lowercased and ANDed together, so order and case don't matter
+        "allergies": sorted({allergy.lower() for allergy in preferences["allergies"]}),
+        "cooking_preference": preferences["cooking_preference"],
+        "calories": float(preferences["calories"]),
+        "goal": goal.lower() if goal else ""
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def recipes_fingerprint(recipes):
+    """Cheap identity of a recipe collection: its size and the hash of its ids in order"""
+    if isinstance(recipes, pd.DataFrame):
+        if "id" not in recipes.columns:
+            return ("frame", len(recipes), id(recipes))
+        hashed = pd.util.hash_pandas_object(recipes["id"], index=False).to_numpy()
+        return ("frame", len(recipes), hashlib.sha256(hashed.tobytes()).hexdigest())
+    return ("records", len(recipes), hash(tuple(get_value(recipe, "id") for recipe in recipes)))
+
+class RulePlanCache:
+    """LRU caches of compiled rule plans and the recipes they select, keyed by preferences and catalog version"""
+    def __init__(self, maxsize=RULE_PLAN_CACHE_SIZE):
+        self.plans = LRUCache(maxsize)
+        self.results = LRUCache(maxsize)
+
+    def plan(self, preferences):
+        """Compiled RulePlan for preferences, reused across catalog versions"""
+        key = preferences_key(preferences)
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = RulePlan(create_rules_from_preferences(preferences))
+            self.plans.put(key, plan)
+        return plan
+
+    def filter(self, recipes, preferences, catalog_version, allergen_index=None, recipes_key=None):
+        """filter_recipes, skipping evaluation when this profile was already run on these recipes"""
+        if not isinstance(recipes, pd.DataFrame):
+            recipes = list(recipes)
+        key = (
+            preferences_key(preferences), catalog_version,
+            recipes_key if recipes_key is not None else recipes_fingerprint(recipes)
+        )
+        records = self.results.get(key)
+        if records is None:
+            columns = RecipeColumns(recipes, allergen_index, catalog_version=catalog_version)
+            records = columns.to_records(*self.plan(preferences).evaluate(columns))
+            self.results.put(key, records)
+        # Copies keep callers from mutating cached records
+        return [recipe.copy() for recipe in records]
+
+    def stats(self):
+        """Hit-rate metrics for both caches"""
+        return {"plans": self.plans.stats(), "results": self.results.stats()}
+
+    def clear(self):
+        """Drop every cached plan and result"""
+        self.plans.clear()
+        self.results.clear()
+
+_rule_plan_cache = RulePlanCache()
+
+def filter_recipes_cached(recipes, preferences, catalog_version, allergen_index=None, recipes_key=None):
+    """filter_recipes through the shared rule plan cache; recipes_key names the recipe set if known"""
+    return _rule_plan_cache.filter(recipes, preferences, catalog_version, allergen_index, recipes_key)
+
+def rule_plan_cache_stats():
+    """Hit-rate metrics of the shared rule plan cache"""
+    return _rule_plan_cache.stats()
@@ -0,0 +1,164 @@
+import math
+
+import pandas as pd
+import pytest
+
+import rules
+from rules import FoodRule
+
+
+def normalize(recipes):
+    """Recipe dicts with NaN turned into None, so results compare with =="""
+    return [
+        {key: None if isinstance(value, float) and math.isnan(value) else value for key, value in recipe.items()}
+        for recipe in recipes
+    ]
+
+
+def assert_same_as_rowwise(recipes, recipe_rules, capsys):
+    """The vectorized filter returns and prints exactly what the row-wise one does"""
+    copied = recipes.copy() if isinstance(recipes, pd.DataFrame) else [dict(recipe) for recipe in recipes]
+    expected = rules.filter_recipes_with_rules_rowwise(copied, recipe_rules)
+    expected_output = capsys.readouterr().out
+    actual = rules.filter_recipes_with_rules(recipes, recipe_rules)
+    assert normalize(actual) == normalize(expected)
+    assert capsys.readouterr().out == expected_output
+    return actual
+
+
+# Messy values on purpose: NaN, None, numeric strings, junk strings and missing keys
+MESSY_RECIPES = [
+    {"id": 1, "name": "a", "calories": 350.0, "protein": 25.0, "carbs": 30.0, "fat": 10.0,
+     "cooking_status": "cooked", "category": "Main Course", "diet_tags": "vegetarian, gluten free",
+     "ingredients": "garlic, olive oil"},
+    {"id": 2, "name": "b", "calories": float("nan"), "protein": 5.0, "carbs": 60.0, "fat": 5.0,
+     "cooking_status": "uncooked", "category": "Vegetarian", "diet_tags": None, "ingredients": "peanut butter, milk"},
+    {"id": 3, "name": "c", "calories": "420", "protein": "abc", "carbs": 10.0, "fat": 30.0,
+     "cooking_status": None, "category": None, "diet_tags": "ketogenic", "ingredients": float("nan")},
+    {"id": 4, "name": "d", "calories": 0, "carbs": 0.0, "fat": 0.0,
+     "cooking_status": "cooked", "category": "snack", "diet_tags": "vegan", "ingredients": "Walnuts, soy sauce"},
+    {"id": 5, "name": "e", "calories": 900.0, "protein": 60.0, "carbs": 20.0, "fat": 40.0,
+     "cooking_status": "", "category": "Main Course", "diet_tags": "vegetarian", "ingredients": None},
+    {"id": 6, "name": "f", "calories": 250.0, "protein": None, "carbs": 45.0, "fat": 8.0,
+     "cooking_status": "cooked", "category": "vegan", "diet_tags": "vegan, vegetarian", "ingredients": "eggs, shrimp"},
+]
+
+MESSY_RULES = [
+    [FoodRule("max_calories", 500, priority=5), FoodRule("min_protein", "10", priority=3)],
+    [FoodRule("require_diet", "vegetarian", priority=5), FoodRule("exclude_ingredient", "NUTS", priority=5)],
+    [FoodRule("calorie_range", (100, "x"), priority=4), FoodRule("unknown", 1, priority=1),
+     FoodRule("max_calories", "bad", priority=1)],
+    [FoodRule("cooking_preference", "cooked", priority=6), FoodRule("calorie_range", (0, 5000), priority=2.5),
+     FoodRule("macro_ratio", {"protein": 0.3, "carbs": 0.4, "fat": 0.3}, priority=1)],
+]
+
+
+@pytest.mark.parametrize("recipe_rules", MESSY_RULES)
+def test_vectorized_matches_rowwise_on_list_of_dicts(recipe_rules, capsys):
+    assert_same_as_rowwise(MESSY_RECIPES, recipe_rules, capsys)
+
+
+@pytest.mark.parametrize("recipe_rules", MESSY_RULES)
+def test_vectorized_matches_rowwise_on_dataframe(recipe_rules, capsys):
+    assert_same_as_rowwise(pd.DataFrame(MESSY_RECIPES), recipe_rules, capsys)
+
+
+def test_missing_column_matches_rowwise(capsys):
+    frame = pd.DataFrame(MESSY_RECIPES).drop(columns=["ingredients", "protein"])
+    recipe_rules = [FoodRule("exclude_ingredient", "milk", priority=5), FoodRule("min_protein", 10, priority=3)]
+    assert_same_as_rowwise(frame, recipe_rules, capsys)
+
+
+@pytest.mark.parametrize("preferences", [
+    {"diet_type": "Vegetarian", "allergies": ["Garlic"], "cooking_preference": "Cooked meals",
+     "calories": 2000, "goal": "weight loss"},
+    {"diet_type": "No restrictions", "allergies": [], "cooking_preference": "No-cook/quick meals",
+     "calories": 1500, "goal": None},
+])
+def test_preference_rules_match_rowwise(preferences, capsys):
+    recipe_rules = rules.create_rules_from_preferences(preferences)
+    assert_same_as_rowwise(MESSY_RECIPES, recipe_rules, capsys)
+    assert_same_as_rowwise(pd.DataFrame(MESSY_RECIPES), recipe_rules, capsys)
+
+
+def tier_recipes(high, medium):
+    """high recipes pass the high-priority rule; the first medium of them also pass the medium one"""
+    return [
+        {"id": i, "calories": 300.0 if i < high else 900.0, "protein": 30.0 if i < medium else 5.0}
+        for i in range(high + 3)
+    ]
+
+
+TIER_RULES = [FoodRule("max_calories", 500, priority=5), FoodRule("min_protein", 20, priority=3)]
+
+
+@pytest.mark.parametrize("high, medium, expected", [
+    (4, 4, 4),  # Fewer than 5 high-priority matches skips the medium tier
+    (5, 2, 5),  # Fewer than 3 medium-priority matches falls back to the high tier
+    (5, 3, 3),  # 3 medium-priority matches are enough
+    (8, 5, 5),
+])
+def test_relaxation_thresholds(high, medium, expected, capsys):
+    recipes = tier_recipes(high, medium)
+    selected = assert_same_as_rowwise(recipes, TIER_RULES, capsys)
+    assert len(selected) == expected
+    assert_same_as_rowwise(pd.DataFrame(recipes), TIER_RULES, capsys)
+
+
+def test_low_priority_rules_score_and_order(capsys):
+    recipes = [{"id": i, "calories": 100.0 * (i + 1)} for i in range(6)]
+    recipe_rules = [FoodRule("max_calories", 250, priority=1), FoodRule("calorie_range", (300, 400), priority=2)]
+    selected = assert_same_as_rowwise(recipes, recipe_rules, capsys)
+    assert [recipe["id"] for recipe in selected][:4] == [0, 1, 2, 3]
+    assert [recipe["expert_score"] for recipe in selected][:4] == [1, 1, 1, 1]
+
+
+BATCH_PROFILES = [
+    {"diet_type": "Vegetarian", "allergies": ["Garlic"], "cooking_preference": "Cooked meals",
+     "calories": 2000, "goal": "weight loss"},
+    {"diet_type": "No restrictions", "allergies": [], "cooking_preference": "No-cook/quick meals",
+     "calories": 1500, "goal": None},
+    {"diet_type": "Vegan", "allergies": ["nuts", "Eggs"], "cooking_preference": "No preference",
+     "calories": 2600, "goal": "muscle gain"},
+    {"diet_type": "Ketogenic", "allergies": ["milk"], "cooking_preference": "No preference",
+     "calories": 1800, "goal": "heart health"},
+]
+
+
+@pytest.mark.parametrize("as_frame", [False, True])
+@pytest.mark.parametrize("batch_cells", [rules.FILTER_BATCH_CELLS, 1])
+def test_batch_matches_per_profile(as_frame, batch_cells, monkeypatch, capsys):
+    # One cell per block forces every profile into its own evaluation block
+    monkeypatch.setattr(rules, "FILTER_BATCH_CELLS", batch_cells)
+    recipes = pd.DataFrame(MESSY_RECIPES) if as_frame else MESSY_RECIPES
+    profiles = BATCH_PROFILES + BATCH_PROFILES[:2]
+    expected = [normalize(rules.filter_recipes(recipes, preferences)) for preferences in profiles]
+    capsys.readouterr()
+    actual = rules.filter_recipes_batch(recipes, profiles)
+    assert [normalize(result) for result in actual] == expected
+
+
+def test_batch_duplicate_profiles_get_their_own_records():
+    first, second = rules.filter_recipes_batch(MESSY_RECIPES, [BATCH_PROFILES[1], dict(BATCH_PROFILES[1])])
+    assert first == second and first
+    first[0]["name"] = "changed"
+    assert second[0]["name"] != "changed"
+
+
+def test_batch_with_no_profiles():
+    assert rules.filter_recipes_batch(MESSY_RECIPES, []) == []
+
+
+def test_allergen_index_only_used_at_its_catalog_version():
+    from recipe_store import AllergenIndex
+
+    frame = pd.DataFrame([{"id": 1, "ingredients": "rice, peas"}, {"id": 2, "ingredients": "bread"}])
+    index = AllergenIndex.build(frame["id"].to_numpy(), frame["ingredients"].tolist(), source_version=("db", 1))
+    # Recipe 1 was re-ingested under the same id with a new ingredient after the index was built
+    newer = frame.assign(ingredients=["rice, peanuts", "bread"])
+    exclude = [FoodRule("exclude_ingredient", "peanuts", priority=10)]
+
+    assert [recipe["id"] for recipe in rules.filter_recipes_with_rules(newer, exclude, index, ("db", 2))] == [2]
+    assert [recipe["id"] for recipe in rules.filter_recipes_with_rules(newer, exclude, index)] == [2]
+    # Claiming the index's own version makes the filter trust it, which is why callers must pass the real one
+    assert [recipe["id"] for recipe in rules.filter_recipes_with_rules(newer, exclude, index, ("db", 1))] == [1, 2]